@@ -1,22 +1,35 @@
+import asyncio
 import base64
+import uuid
+from collections import OrderedDict
 from io import BytesIO
 import json
 from PIL import Image
 from typing import Dict
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Depends, Request, Query
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel, validator
-from typing import List, Dict, Union
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, validator
+from typing import List, Dict, Optional, Union
 import logging
 from pydantic import BaseModel
 from typing import List
 import pandas as pd
-from reports import Reports
+from reports import build_dashboard_report, build_report
 from models import GoogleFormsTranslationMap, QuestionnaireDataModel, DashboardDataModel
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from data_processor import DataProcessor
+from batch_import import import_export
+from courses import department_courses, get_course_index
+from dashboard import get_dashboard_cache
+from charts import get_chart_renderer
+from exports import FILTER_COLUMNS, export_stream
+from storage import get_storage
+from jobs import JobQueue
+from model_registry import ACTIVE_MODEL, get_registry
+from training import activate_bundle, check_trainable, list_bundles, run_training
+from users import get_user_store
 
 app = FastAPI()
 
@@ -52,16 +65,142 @@ class DepartmentCoursesResponse(BaseModel):
 class FilePath(BaseModel):
     path: str
 
+scoring_jobs = JobQueue("scoring")
+training_jobs = JobQueue("training")
+# Each worker builds one report at a time, so this caps concurrent report builds
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "2"))
+report_jobs = JobQueue("reports", workers=REPORT_WORKERS)
+REPORTS_DIR = "../data/reports"
+# Report ID -> ID of the job building it
+report_job_ids = OrderedDict()
+
+@app.on_event("startup")
+async def start_job_queues():
+    await scoring_jobs.start()
+    await training_jobs.start()
+    await report_jobs.start()
+
+@app.on_event("startup")
+async def load_models():
+    registry = await asyncio.to_thread(get_registry)
+    if registry.pipeline() is None:
+        # First start without a bundle: train one offline, then score pending rows
+        print("No model bundle found, queueing initial training")
+        training_jobs.submit(train_then_rescore, kind="training")
+
+@app.on_event("startup")
+async def load_course_index():
+    universities = await asyncio.to_thread(get_course_index().load_all)
+    print(f"Course index ready for {universities}")
+
+@app.on_event("startup")
+async def start_chart_renderer():
+    await asyncio.to_thread(get_chart_renderer().start)
+
+@app.on_event("shutdown")
+async def stop_job_queues():
+    await scoring_jobs.stop()
+    await training_jobs.stop()
+    await report_jobs.stop()
+    get_chart_renderer().close()
+
+def train_then_rescore(model_name=ACTIVE_MODEL, search=False, activate=True):
+    info = run_training(model_name=model_name, search=search, activate=activate)
+    if activate:
+        DataProcessor.update_predictions(full=True)
+    return info
+
+def get_job(job_id: str):
+    for queue in (scoring_jobs, training_jobs, report_jobs):
+        job = queue.status(job_id)
+        if job is not None:
+            job.pop("result", None)
+            return job
+    raise HTTPException(status_code=404, detail="Job not found")
+
+async def save_and_queue_scoring(data: QuestionnaireDataModel, university: str):
+    """Append the submission, then hand prediction updates to the scoring worker"""
+    try:
+        await asyncio.to_thread(DataProcessor.save_submission, data, university)
+    except Exception as e:
+        print(f"Error saving survey data: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save survey data")
+    
+    # Submissions arriving while a run is queued share that run
+    job_id = scoring_jobs.submit(DataProcessor.update_predictions, coalesce_key="predictions")
+    return {"status": "success", "message": "Survey submitted successfully", "job_id": job_id}
+
+@app.post("/api/submit/batch")
+async def submit_batch(
+    request: Request,
+    university: str = Query(...),
+    filename: Optional[str] = Query(None),
+    strict: bool = Query(False),
+    dry_run: bool = Query(False),
+    dayfirst: Optional[bool] = Query(None),
+):
+    """Import a Google Forms CSV or XLSX export sent as the raw request body"""
+    content = await request.body()
+    if not content:
+        raise HTTPException(status_code=400, detail="Send the exported CSV or XLSX file as the request body")
+    try:
+        summary = await asyncio.to_thread(import_export, content, university, filename, strict, dry_run, dayfirst)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to import responses")
+
+    if summary['imported']:
+        # One scoring run predicts every imported row at once
+        summary['job_id'] = scoring_jobs.submit(DataProcessor.update_predictions, coalesce_key="predictions")
+    return summary
+
 @app.post("/api/submit/{university}")
 async def submit_questionaire(university: str, data: QuestionnaireDataModel):
+    return await save_and_queue_scoring(data, university)
+
+@app.get("/api/models")
+async def get_models():
+    registry = get_registry()
+    return {"models": registry.stats(), "active_bundle": registry.bundle_info()}
+
+@app.post("/api/models/train")
+async def train_model(model_name: str = ACTIVE_MODEL, search: bool = False, activate: bool = True):
     try:
-        # Save data to Excel
-        if DataProcessor.save_and_evaluate(data, university):
-            return {"status": "success", "message": "Survey submitted successfully"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save survey data")
-    except Exception as e:
+        check_trainable(model_name, search)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    job_id = training_jobs.submit(train_then_rescore, model_name=model_name, search=search, activate=activate, kind="training")
+    return {"message": "Training queued", "job_id": job_id}
+
+@app.get("/api/models/bundles")
+async def get_model_bundles():
+    return {"bundles": list_bundles(), "active_bundle": get_registry().bundle_info()}
+
+@app.post("/api/models/bundles/{version}/activate")
+async def activate_model_bundle(version: str):
+    try:
+        activate_bundle(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    await asyncio.to_thread(get_registry().refresh_bundle)
+    job_id = scoring_jobs.submit(DataProcessor.update_predictions, full=True, kind="rescore")
+    return {"message": "Model bundle activated", "version": version, "job_id": job_id}
+
+@app.post("/api/models/reload")
+async def reload_models():
+    changed = await asyncio.to_thread(get_registry().refresh, True)
+    return {"message": "Models reloaded", "reloaded": changed, "models": get_registry().stats()}
+
+@app.post("/api/predictions/rescore")
+async def rescore_predictions(full: bool = True):
+    job_id = scoring_jobs.submit(DataProcessor.update_predictions, full=full, kind="rescore")
+    return {"message": "Rescore queued", "job_id": job_id}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    return get_job(job_id)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -108,49 +247,86 @@ class DashboardData(BaseModel):
     captured_at: str
 
 class ReportRequest(BaseModel):
-    data: List[DashboardData]
-    charts: Dict[str, str]
+    """Dashboard selection to report on; charts are rendered on the server.
+
+    data and charts are still accepted from older clients that send the
+    filtered rows and chart images themselves.
+    """
+    university: Optional[str] = None
+    year: Optional[str] = None
+    filters: Dict[str, List[Union[str, int, float]]] = {}
+    departments: List[str] = []
+    data: Optional[List[DashboardData]] = None
+    charts: Optional[Dict[str, str]] = None
 
     @validator('charts')
     def validate_charts(cls, v):
-        for key, value in v.items():
+        for key, value in (v or {}).items():
             if not value.startswith('data:image'):
                 raise ValueError(f'Invalid image format for {key}')
         return v
 
-@app.post("/api/reports")
+def report_file(report_id: str):
+    return f"{REPORTS_DIR}/Mental_Health_Report_{report_id}.pdf"
+
+@app.post("/api/reports", status_code=202)
 async def generate_reports(request: ReportRequest):
+    """Queue a report build; poll status_url, then fetch the PDF from report_url"""
+    unknown = [col for col, values in request.filters.items() if values and col not in FILTER_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown filter columns: {unknown}")
     try:
-        df = pd.DataFrame([item.dict() for item in request.data])
-        reports = Reports(df)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-        
-        # Decode chart images
-        chart_images = {}
-        for key, chart in request.charts.items():
-            if isinstance(chart, str) and chart.startswith("data:image/png;base64,"):
-                chart_images[key] = chart
+        courses = department_courses(request.university, request.departments) if request.departments else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        report_id = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:6]}"
         
-        # Generate PDF report and save it temporarily
-        report_path = f"../data/reports/Mental_Health_Report_{timestamp}.pdf"
-        reports.generate_pdf_report(report_path, chart_images)
+        if request.data is not None:
+            df = pd.DataFrame([item.dict() for item in request.data])
+            # Decode chart images
+            chart_images = {}
+            for key, chart in (request.charts or {}).items():
+                if isinstance(chart, str) and chart.startswith("data:image/png;base64,"):
+                    chart_images[key] = chart
+            job_id = report_jobs.submit(build_report, df, chart_images, report_file(report_id), kind="report", with_progress=True)
+        else:
+            job_id = report_jobs.submit(
+                build_dashboard_report, report_file(report_id), request.university, request.year,
+                request.filters, courses, kind="report", with_progress=True
+            )
+        report_job_ids[report_id] = job_id
+        while len(report_job_ids) > report_jobs.max_history:
+            report_job_ids.popitem(last=False)
         
-        return {"message": "Report generated", "report_url": f"/api/reports/view/{timestamp}"}
+        return {
+            "message": "Report queued",
+            "job_id": job_id,
+            "report_id": report_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "report_url": f"/api/reports/view/{report_id}"
+        }
     except Exception as e:
-        logger.error(f"Error generating report: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing report: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.get("/api/reports/view/{timestamp}")
 async def view_report(timestamp: str):
-    report_path = f"../data/reports/Mental_Health_Report_{timestamp}.pdf"
+    report_path = report_file(timestamp)
     if os.path.exists(report_path):
         return FileResponse(report_path, media_type='application/pdf', filename=f"Mental_Health_Report_{timestamp}.pdf")
-    else:
-        raise HTTPException(status_code=404, detail="Report not found")
+
+    job = report_jobs.status(report_job_ids.get(timestamp))
+    if job is not None and job["status"] in ("queued", "running"):
+        job.pop("result", None)
+        return JSONResponse(job, status_code=202)
+    if job is not None and job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Report failed: {job['error']}")
+    raise HTTPException(status_code=404, detail="Report not found")
 
 @app.delete("/api/reports/delete/{timestamp}")
 async def delete_report(timestamp: str):
-    report_path = f"../data/reports/Mental_Health_Report_{timestamp}.pdf"
+    report_path = report_file(timestamp)
     if os.path.exists(report_path):
         os.remove(report_path)
         return {"message": "Report deleted"}
@@ -195,124 +371,52 @@ async def security_gate(request: Request, call_next):
     return await call_next(request)
 
 @app.get("/api/courses/{university}", response_model=CourseResponse)
-async def get_courses(university: str):
+async def get_courses(university: str, request: Request):
     try:
-        # Construct file path
-        file_path = f"../data/{university.lower()}/{university.lower()}_courses.xlsx"
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"Course file not found for {university}")
-        
-        # Read Excel file
-        df = pd.read_excel(file_path)
-        
-        # Convert to list of unique courses
-        courses = df['Courses'].dropna().unique().tolist()
-        
-        return {
-            "courses": courses,
-            "university": university
-        }
+        return get_course_index().courses_response(university).response(request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/departments/{university}", response_model=DepartmentCoursesResponse)
-async def get_departments(university: str):
-    print(university )
+async def get_departments(university: str, request: Request):
     try:
-        file_path = f"../data/{university.lower()}/{university.lower()}_courses.xlsx"
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"Course file not found for {university}")
-        
-        df = pd.read_excel(file_path)
-        department_course_map = {}
-        
-        for index, row in df.iterrows():
-            department = str(row['Departments']).strip() if pd.notna(row['Departments']) else None
-            course = str(row['Courses']).strip() if pd.notna(row['Courses']) else None
-            
-            if department and course:
-                if department not in department_course_map:
-                    department_course_map[department] = []
-                department_course_map[department].append(course)
-        
-        return {
-            "university": university,
-            "departments": department_course_map
-        }
+        return get_course_index().departments_response(university).response(request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_user_data():
-    file_path = "../data/login/login_data.xlsx"
-    if os.path.exists(file_path):
-        df = pd.read_excel(file_path, header=0)
-        return df
-    else:
-        return pd.DataFrame(columns=["email", "password", "isAdmin", "university"])
-
 @app.post("/api/login")
 async def login(data: LoginFormInputs):
     try:
-        df = get_user_data()
-        print("Input data:", data.email, data.password)
-        print("DataFrame before comparison:", df)
+        user = await asyncio.to_thread(get_user_store().authenticate, data.email, data.password)
         
-        # Convert values to string and handle NaN
-        df['email'] = df['email'].fillna('').astype(str)
-        df['password'] = df['password'].fillna('').astype(str)
-        df['university'] = df['university'].fillna('').astype(str)
-        
-        # Clean input data
-        clean_email = str(data.email).strip()
-        clean_password = str(data.password).strip()
-        
-        # Compare values
-        user = df[
-            (df['email'].str.strip() == clean_email) & 
-            (df['password'].str.strip() == clean_password)
-        ]
-        
-        # print("Matched user:", user)
-        
-        if not user.empty:
+        if user is not None:
             return {
                 "message": "Login successful",
-                "isAdmin": bool(user.iloc[0]['isAdmin']),
-                "university": user.iloc[0]['university']
+                "isAdmin": user['isAdmin'],
+                "university": user['university']
             }
         else:
             raise HTTPException(status_code=401, detail="Invalid credentials")
             
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Login error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Login error: {str(e)}")
 
-def save_user_data(df):
-    file_path = "../data/login/login_data.xlsx"
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    df.to_excel(file_path, index=False)
-
 @app.post("/api/register")
 async def register(data: RegisterFormInputs):
     try:
-        df = get_user_data()
         print("Registration attempt for:", data.email)
-        
-        if data.email in df['email'].values:
-            raise HTTPException(status_code=400, detail="User already exists")
-        
-        new_user = pd.DataFrame([{
-            'email': str(data.email).strip(),
-            'password': str(data.password).strip(),
-            'isAdmin': bool(data.isAdmin)
-        }])
-        
-        df = pd.concat([df, new_user], ignore_index=True)
-        save_user_data(df)
+        await asyncio.to_thread(get_user_store().add, data.email, data.password, data.isAdmin)
         
         return {"message": "User registered successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Registration error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Registration error: {str(e)}")
@@ -320,73 +424,32 @@ async def register(data: RegisterFormInputs):
 @app.delete("/api/deleteUser")
 async def delete_user(email: str):
     try:
-        df = get_user_data()
         print("Delete attempt for:", email)
-        
-        if email not in df['email'].values:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        df = df[df['email'] != email]
-        save_user_data(df)
+        await asyncio.to_thread(get_user_store().delete, email)
         
         return {"message": "User deleted successfully"}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="User not found")
     except Exception as e:
         print(f"Delete error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Delete error: {str(e)}")
 
-def process_excel_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    
-    numeric_columns = {
-        'hours_per_week_university_work': 0,
-        'exercise_per_week': 0,
-        'work_hours_per_week': 0,
-        'age': 0,
-        'total_device_hours': 0,
-        'hours_socialmedia': 0,
-        'hours_between_lectures': 0,
-        'hours_per_week_lectures': 0,
-        'hours_socialising': 0,
-        'cost_of_study': 0
-    }
-    
-    for col, default in numeric_columns.items():
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(default).astype(int)
-        else:
-            df[col] = default
-    
-    for col in df.columns:
-        if col not in numeric_columns:
-            df[col] = df[col].fillna('Not Provided')
-    
-    # print("Processed columns:", df.columns.tolist())
-    # print("Data types:", df.dtypes)
-    
-    return df
-
 @app.get("/api/dashboard")
-async def get_dashboard_data(university: str = Query(None)):
+async def get_dashboard_data(
+    request: Request,
+    university: str = Query(None),
+    fields: str = Query(None, description="Comma-separated columns to return, e.g. age,predictions"),
+    cursor: str = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(None, ge=1, le=10000, description="Rows per page; all rows when omitted")
+):
     try:
-        file_path = "../data/merged/merged_data.xlsx"
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Data file not found")
-        
-        df = pd.read_excel(file_path, header=None)
-        print("Original columns:", df.columns.tolist())
-        column_ids = df.iloc[1].copy()
-        df_cleaned = df.iloc[2:] 
-        df_cleaned.columns = column_ids
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+        prepared = await asyncio.to_thread(get_dashboard_cache().page_response, university, fields, cursor, limit)
         
-        df_processed = process_excel_data(df_cleaned)
-        
-        if university and university != 'All':
-            df_processed = df_processed[df_processed['source'] == university]
-        
-        data = df_processed.to_dict('records')
-        
-        return {"data": data}
+        return prepared.response(request)
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Dashboard error: {str(e)}")
         raise HTTPException(
@@ -394,6 +457,104 @@ async def get_dashboard_data(university: str = Query(None)):
             detail={"error": "Failed to fetch dashboard data", "details": str(e)}
         )
 
+class DashboardQuery(BaseModel):
+    university: Optional[str] = None
+    year: Optional[str] = None
+    filters: Dict[str, List[Union[str, int, float]]] = {}
+    departments: List[str] = []
+    view: str = "rows"
+    fields: Optional[List[str]] = None
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1, le=10000)
+    bins: int = Field(10, ge=1, le=100)
+
+DASHBOARD_QUERY_PARAMS = {'university', 'year', 'department', 'view', 'fields', 'cursor', 'limit', 'bins', 'format'}
+
+def dashboard_query_from_params(request: Request, view: str = None):
+    """Build a query from ?university=UAL&year=2024-2025&department=Art&gender=Male&gender=Female...
+
+    Every parameter that is not a query option filters a column; repeat it to allow several values.
+    """
+    params = request.query_params
+    fields = params.get('fields')
+    options = {
+        key: params.get(key) for key in ('university', 'year', 'cursor', 'limit', 'bins') if params.get(key) is not None
+    }
+    return DashboardQuery(
+        **options,
+        view=view or params.get('view') or "rows",
+        departments=params.getlist('department'),
+        fields=[field.strip() for field in fields.split(',') if field.strip()] if fields else None,
+        filters={key: params.getlist(key) for key in params.keys() if key not in DASHBOARD_QUERY_PARAMS}
+    )
+
+def run_dashboard_query(query: DashboardQuery):
+    cache = get_dashboard_cache()
+    courses = department_courses(query.university, query.departments) if query.departments else None
+    if query.view == "aggregates":
+        return cache.aggregates_response(query.university, query.year, query.filters, query.bins, courses=courses)
+    if query.view == "rows":
+        return cache.page_response(
+            query.university, query.fields, query.cursor, query.limit,
+            year=query.year, filters=query.filters, courses=courses
+        )
+    raise ValueError(f"Unknown view: {query.view}; use 'rows' or 'aggregates'")
+
+async def respond_to_dashboard_query(request: Request, build_query):
+    try:
+        query = build_query()
+        prepared = await asyncio.to_thread(run_dashboard_query, query)
+        return prepared.response(request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Dashboard query error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Failed to query dashboard data", "details": str(e)}
+        )
+
+@app.get("/api/dashboard/aggregates")
+async def get_dashboard_aggregates(request: Request):
+    return await respond_to_dashboard_query(request, lambda: dashboard_query_from_params(request, view="aggregates"))
+
+@app.get("/api/dashboard/query")
+async def get_dashboard_query(request: Request):
+    return await respond_to_dashboard_query(request, lambda: dashboard_query_from_params(request))
+
+@app.post("/api/dashboard/query")
+async def post_dashboard_query(request: Request, query: DashboardQuery):
+    return await respond_to_dashboard_query(request, lambda: query)
+
+def stream_export(query: DashboardQuery, format: str):
+    """Stream the responses matching a dashboard query as a file download"""
+    try:
+        source = query.university if query.university and query.university != 'All' else None
+        courses = department_courses(query.university, query.departments) if query.departments else None
+        body, media_type, extension = export_stream(get_storage(), format, source, query.year, query.filters, courses)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting data: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    filename = f"{(source or 'merged').lower()}_data_{timestamp}.{extension}"
+    return StreamingResponse(body, media_type=media_type, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.get("/api/export")
+async def export_data(request: Request, format: str = Query("csv")):
+    """Download the responses as csv, xlsx or parquet, filtered like the dashboard"""
+    return stream_export(dashboard_query_from_params(request), format)
+
+@app.get("/api/export/excel")
+async def export_excel(request: Request):
+    return stream_export(dashboard_query_from_params(request), "xlsx")
+
 @app.post("/webhook")
 async def webhook(request: Request):
     data = await request.json()
@@ -416,10 +577,4 @@ async def webhook(request: Request):
     return await webhook_submit_questionnaire(university, questionnaire_data)
 
 async def webhook_submit_questionnaire(university: str, data: QuestionnaireDataModel):
-    try:
-        if DataProcessor.save_and_evaluate(data, university):
-            return {"status": "success", "message": "Survey submitted successfully"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save survey data")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+    return await save_and_queue_scoring(data, university)
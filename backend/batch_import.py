@@ -0,0 +1,177 @@
+import os
+import re
+from datetime import datetime
+from io import BytesIO
+import pandas as pd
+from pydantic import ValidationError
+from data_processor import DataProcessor
+from models import GoogleFormsTranslationMap, QuestionnaireColumnsModel
+from storage import get_storage
+
+# Column Google Forms adds with the submission time, in the English and Polish exports
+TIMESTAMP_COLUMNS = ('Timestamp', 'Sygnatura czasowa')
+QUESTION_FIELDS = list(dict.fromkeys(GoogleFormsTranslationMap.values()))
+# Checkbox questions; Google Forms joins the ticked answers with ', '
+LIST_FIELDS = ('stress_in_general',)
+# Split between ticked answers only, not at the commas inside one, e.g. "Yes (due to other circumstances, such as ...)"
+ANSWER_SEPARATOR = re.compile(r',\s*(?=Yes|No)')
+# Timestamp formats of the Forms exports; the slashed ones depend on the locale of the spreadsheet
+TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %I:%M:%S %p', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M')
+DAY_FIRST_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M')
+MONTH_FIRST_FORMATS = ('%m/%d/%Y %H:%M:%S', '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M')
+
+
+def _header_key(header):
+    return ' '.join(str(header).split())
+
+
+_HEADER_TO_FIELD = {_header_key(question): field for question, field in GoogleFormsTranslationMap.items()}
+
+
+def read_export(content, filename=None):
+    """Read a Google Forms export given as bytes, as CSV unless it is an Excel workbook"""
+    is_excel = content[:2] == b'PK' or (filename or '').lower().endswith(('.xlsx', '.xls'))
+    if is_excel:
+        return pd.read_excel(BytesIO(content), dtype=object)
+    return pd.read_csv(BytesIO(content), dtype=object, encoding='utf-8-sig')
+
+
+def _answer_text(value):
+    if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _parse_timestamps(values, formats):
+    """Values parsed with whichever of the formats reads the most of them"""
+    best = None
+    for fmt in formats:
+        parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+        if best is None or parsed.notna().sum() > best.notna().sum():
+            best = parsed
+    return best
+
+
+def _captured_at(values, dayfirst=None):
+    """Google Forms timestamps in the 'dd.mm.yyyy HH:MM' format of the merged store, now if unparseable.
+
+    A column is read with one explicit format. Slashed dates that read
+    both day first and month first, as in 01/02/2024, are rejected unless
+    dayfirst says which locale the export came from.
+    """
+    # Excel exports already hold datetimes
+    is_datetime = values.map(lambda value: isinstance(value, datetime))
+    cleaned = values.where(~is_datetime).astype(str).str.replace(r'\s*GMT.*$', '', regex=True).str.strip()
+    explicit = _parse_timestamps(cleaned, TIMESTAMP_FORMATS)
+    day_first = _parse_timestamps(cleaned, DAY_FIRST_FORMATS)
+    month_first = _parse_timestamps(cleaned, MONTH_FIRST_FORMATS)
+    counts = [explicit.notna().sum(), day_first.notna().sum(), month_first.notna().sum()]
+    if counts[0] >= max(counts[1:]):
+        parsed = explicit
+    elif counts[1] != counts[2]:
+        parsed = day_first if counts[1] > counts[2] else month_first
+    elif dayfirst is None:
+        sample = cleaned[day_first.notna()].iloc[0]
+        raise ValueError(f"Ambiguous timestamps such as '{sample}' could be day or month first; say which the export uses")
+    else:
+        parsed = day_first if dayfirst else month_first
+    parsed = parsed.where(~is_datetime, pd.to_datetime(values.where(is_datetime), errors='coerce'))
+    now = datetime.now().strftime('%d.%m.%Y %H:%M')
+    return parsed.dt.strftime('%d.%m.%Y %H:%M').where(parsed.notna(), now)
+
+
+def parse_export(df, university, dayfirst=None):
+    """Validate every response of an export and turn the valid ones into storage rows.
+
+    Returns the rows, the rejected responses with their spreadsheet row
+    number and validation errors, and the columns that match no question.
+    dayfirst settles timestamps that read both day and month first.
+    """
+    fields = {col: _HEADER_TO_FIELD.get(_header_key(col)) for col in df.columns}
+    timestamp = next((col for col in df.columns if _header_key(col) in TIMESTAMP_COLUMNS), None)
+    unmapped = [str(col) for col, field in fields.items() if field is None and col != timestamp]
+    missing = [field for field in QUESTION_FIELDS if field not in fields.values()]
+    if missing:
+        raise ValueError(f"Export is missing the questions for: {missing}")
+
+    columns = {field: col for col, field in reversed(list(fields.items())) if field is not None}
+    captured_at = _captured_at(df[timestamp], dayfirst) if timestamp is not None else pd.Series(
+        datetime.now().strftime('%d.%m.%Y %H:%M'), index=df.index
+    )
+    source = university.upper()
+
+    rows, rejected = [], []
+    # Header is spreadsheet row 1
+    for row_number, (index, record) in enumerate(df.iterrows(), start=2):
+        answers = {field: _answer_text(record[col]) for field, col in columns.items()}
+        for field in LIST_FIELDS:
+            answers[field] = [item.strip() for item in ANSWER_SEPARATOR.split(answers[field]) if item.strip()]
+        try:
+            validated = QuestionnaireColumnsModel(
+                **answers, source=source, predictions=0, captured_at=captured_at[index]
+            ).dict()
+        except ValidationError as e:
+            rejected.append({
+                'row': row_number,
+                'errors': [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()],
+            })
+            continue
+        rows.append(DataProcessor.build_row({
+            'answers': [{'id': field, 'answer': validated[field]} for field in QUESTION_FIELDS],
+            'source': source,
+            'predictions': 0,
+            'captured_at': validated['captured_at'],
+        }))
+    return rows, rejected, unmapped
+
+
+def import_export(content, university, filename=None, strict=False, dry_run=False, dayfirst=None):
+    """Append every valid response of a Google Forms export to the merged store in one write.
+
+    With strict=True nothing is imported when any response is invalid;
+    dry_run=True only validates. Scoring is left to the caller, so the new
+    rows go through the model in one run.
+    """
+    df = read_export(content, filename)
+    rows, rejected, unmapped = parse_export(df, university, dayfirst)
+    imported = 0
+    if rows and not dry_run and not (strict and rejected):
+        get_storage().append_rows(rows)
+        imported = len(rows)
+    print(f"Imported {imported} of {len(df)} responses for {university.upper()} ({len(rejected)} rejected)")
+    return {
+        'university': university.upper(),
+        'responses': len(df),
+        'imported': imported,
+        'rejected': rejected,
+        'unmapped_columns': unmapped,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Import a Google Forms CSV or XLSX export into the merged store")
+    parser.add_argument("path")
+    parser.add_argument("--university", required=True)
+    parser.add_argument("--strict", action="store_true", help="import nothing if any response is invalid")
+    parser.add_argument("--dry-run", action="store_true", help="only validate the export")
+    parser.add_argument("--no-score", action="store_true", help="leave the new rows for the next scoring run")
+    order = parser.add_mutually_exclusive_group()
+    order.add_argument("--day-first", dest="dayfirst", action="store_true", default=None, help="read dates like 01/02/2024 as 1 February")
+    order.add_argument("--month-first", dest="dayfirst", action="store_false", help="read dates like 01/02/2024 as 2 January")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open(args.path, 'rb') as f:
+        summary = import_export(
+            f.read(), args.university, os.path.basename(args.path), args.strict, args.dry_run, args.dayfirst
+        )
+    if summary['imported'] and not args.no_score:
+        DataProcessor.update_predictions()
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    print(f"Finished in {time.perf_counter() - started:.1f}s")
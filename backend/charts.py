@@ -0,0 +1,296 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from matplotlib.figure import Figure
+
+# Processes rendering report charts, and the rendered charts kept per storage state
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", "256"))
+# Answers shown per categorical chart, most common first
+CHART_MAX_VALUES = 20
+CHART_DPI = 100
+
+# Report charts in dashboard order: chart key -> (column, title)
+REPORT_CHARTS = OrderedDict([
+    # Demographics
+    ('ethnic_group', ('ethnic_group', "Ethnic Group")),
+    ('age', ('age', "Age")),
+    ('gender', ('gender', "Gender")),
+    ('student_type_location', ('student_type_location', "Student Type (Location)")),
+    ('student_type_time', ('student_type_time', "Student Type (Time)")),
+    ('home_country', ('home_country', "Home Country")),
+    # Academic context
+    ('course_of_study', ('course_of_study', "Course of Study")),
+    ('hours_per_week_lectures', ('hours_per_week_lectures', "Hours per Week (Lectures)")),
+    ('hours_per_week_university_work', ('hours_per_week_university_work', "Hours per Week (University Work)")),
+    ('level_of_study', ('level_of_study', "Level of Study")),
+    ('timetable_preference', ('timetable_preference', "Timetable Preference")),
+    ('timetable_reasons', ('timetable_reasons', "Timetable Reasons")),
+    ('timetable_impact', ('timetable_impact', "Timetable Impact")),
+    # Socioeconomic factors
+    ('financial_support', ('financial_support', "Financial Support")),
+    ('financial_problems', ('financial_problems', "Financial Problems")),
+    ('family_earning_class', ('family_earning_class', "Family Earning Class")),
+    ('form_of_employment', ('form_of_employment', "Form of Employment")),
+    ('work_hours_per_week', ('work_hours_per_week', "Work Hours per Week")),
+    ('cost_of_study', ('cost_of_study', "Cost of Study")),
+    # Lifestyle and behaviour
+    ('diet', ('diet', "Diet")),
+    ('well_hydrated', ('well_hydrated', "Well Hydrated")),
+    ('exercise_per_week', ('exercise_per_week', "Exercise per Week")),
+    ('alcohol_consumption', ('alcohol_consumption', "Alcohol Consumption")),
+    ('personality_type', ('personality_type', "Personality Type")),
+    ('physical_activities', ('physical_activities', "Physical Activities")),
+    ('mental_health_activities', ('mental_health_activities', "Mental Health Activities")),
+    # Social and technological factors
+    ('hours_socialmedia', ('hours_socialmedia', "Hours on Social Media")),
+    ('total_device_hours', ('total_device_hours', "Total Device Hours")),
+    ('hours_socialising', ('hours_socialising', "Hours Socialising")),
+    # Psychological and emotional factors
+    ('quality_of_life', ('quality_of_life', "Quality of Life")),
+    ('feel_afraid', ('feel_afraid', "Feel Afraid")),
+    ('stress_in_general', ('stress_in_general', "Stress in General")),
+    ('stress_before_exams', ('stress_before_exams', "Stress before Exams")),
+    ('known_disabilities', ('known_disabilities', "Known Disabilities")),
+    ('sense_of_belonging', ('sense_of_belonging', "Sense of Belonging")),
+])
+
+
+def _label(value, length=25):
+    text = str(value)
+    return text if len(text) <= length else text[:length - 2] + '..'
+
+
+def chart_series(aggregates, numeric=False):
+    """Bar labels and (no issues, issues) counts from one column of the dashboard aggregates"""
+    if not aggregates:
+        return [], [], []
+    histogram = aggregates.get('histogram') if numeric else None
+    if histogram and histogram['edges']:
+        edges = histogram['edges']
+        labels = [f"{low:g}-{high:g}" for low, high in zip(edges, edges[1:])]
+        return labels, histogram['prediction_0'], histogram['prediction_1']
+    counts = aggregates['counts'][:CHART_MAX_VALUES]
+    return (
+        [_label(entry['value']) for entry in counts],
+        [entry['prediction_0'] for entry in counts],
+        [entry['prediction_1'] for entry in counts],
+    )
+
+
+def render_chart(title, labels, no_issues, issues):
+    """Stacked bar chart of responses per answer, as PNG bytes; runs in a worker process"""
+    # Figure without pyplot keeps no global state between charts
+    figure = Figure(figsize=(8, 5), dpi=CHART_DPI)
+    ax = figure.subplots()
+    positions = list(range(len(labels)))
+    ax.bar(positions, no_issues, color='#82ca9d', label='No MH Issues')
+    ax.bar(positions, issues, bottom=no_issues, color='#ff0000', label='MH Issues')
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=8)
+    ax.set_ylabel("Responses")
+    ax.set_title(title)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    if labels:
+        ax.legend()
+    else:
+        ax.text(0.5, 0.5, "No responses", ha='center', va='center', transform=ax.transAxes)
+    figure.tight_layout()
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+class RenderedCharts(Mapping):
+    """Chart key -> PNG bytes; looking up a chart waits for it to finish rendering.
+
+    A chart lost with a worker that died is rendered once more by resubmit.
+    """
+
+    def __init__(self, futures, resubmit=None):
+        self._futures = futures
+        self._resubmit = resubmit
+
+    def __getitem__(self, key):
+        try:
+            return self._futures[key].result()
+        except BrokenProcessPool:
+            if self._resubmit is None:
+                raise
+            self._futures[key] = self._resubmit(key)
+            return self._futures[key].result()
+
+    def __iter__(self):
+        return iter(self._futures)
+
+    def __len__(self):
+        return len(self._futures)
+
+
+class ChartRenderer:
+    """Report charts rendered from the dashboard aggregates in a process pool.
+
+    Charts are cached per storage state, university, filter set and chart,
+    like the dashboard results, so reports over the same selection reuse
+    them. A chart being rendered is shared by every report that asks for
+    it; a failed one is dropped so the next report tries again. A pool left
+    broken by a worker that died is shut down and started afresh.
+    """
+
+    def __init__(self, dashboard_cache, workers=CHART_WORKERS, maxsize=CHART_CACHE_SIZE):
+        self.dashboard_cache = dashboard_cache
+        self.workers = workers
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Reentrant: a future that is already done runs its callback straight away
+        self._lock = threading.RLock()
+        self._executor = None
+        self._charts = OrderedDict()
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned, not forked: the API process runs threads and holds open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _discard_pool(self, pool):
+        """Shut down a broken pool, so the next render starts a new one, and drop the charts that failed with it"""
+        with self._lock:
+            if self._executor is pool:
+                print("A chart worker died; restarting the chart pool")
+                self._executor = None
+            failed = [
+                key for key, future in self._charts.items()
+                if future.done() and (future.cancelled() or future.exception() is not None)
+            ]
+            for key in failed:
+                del self._charts[key]
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _forget_failed(self, key, future, pool):
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._charts.get(key) is future:
+                    del self._charts[key]
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard_pool(pool)
+
+    def _submit_render(self, *args):
+        """Submit a render to the pool, replacing the pool once if it is broken; returns the pool and the future"""
+        with self._lock:
+            pool = self._pool()
+            try:
+                return pool, pool.submit(render_chart, *args)
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+                pool = self._pool()
+                return pool, pool.submit(render_chart, *args)
+
+    def start(self):
+        """Start the worker processes without waiting for them, so the first report does not pay for it"""
+        with self._lock:
+            for _ in range(self.workers):
+                self._submit_render("", [], [], [])
+
+    def submit(self, university=None, year=None, filters=None, courses=None, charts=None):
+        """Start rendering the charts for a dashboard selection and return them as RenderedCharts"""
+        # Imported here rather than at the top, so worker processes only load matplotlib
+        from dashboard import NUMERIC_COLUMNS, query_key
+
+        charts = list(charts or REPORT_CHARTS)
+        unknown = [chart for chart in charts if chart not in REPORT_CHARTS]
+        if unknown:
+            raise ValueError(f"Unknown charts: {unknown}")
+        view = university if university and university != 'All' else None
+        selection = (self.dashboard_cache.storage.change_token(), view, query_key(year, filters, courses))
+
+        with self._lock:
+            missing = [chart for chart in charts if selection + (chart,) not in self._charts]
+        columns = self.dashboard_cache.aggregates(university, year, filters, courses=courses)['columns'] if missing else None
+
+        futures = OrderedDict()
+        with self._lock:
+            for chart in charts:
+                key = selection + (chart,)
+                future = self._charts.get(key)
+                if future is not None:
+                    self._charts.move_to_end(key)
+                    self.hits += 1
+                else:
+                    if columns is None:
+                        columns = self.dashboard_cache.aggregates(university, year, filters, courses=courses)['columns']
+                    column, title = REPORT_CHARTS[chart]
+                    labels, no_issues, issues = chart_series(columns.get(column), column in NUMERIC_COLUMNS)
+                    pool, future = self._submit_render(f"{title} Chart", labels, no_issues, issues)
+                    self._charts[key] = future
+                    future.add_done_callback(lambda done, key=key, pool=pool: self._forget_failed(key, done, pool))
+                    self.misses += 1
+                futures[chart] = future
+            while len(self._charts) > self.maxsize:
+                self._charts.popitem(last=False)
+        # Renders lost with a dead worker are submitted again; the failed futures are already out of the cache
+        def resubmit(chart):
+            return self.submit(university, year, filters, courses, [chart])._futures[chart]
+
+        return RenderedCharts(futures, resubmit)
+
+    def render(self, university=None, year=None, filters=None, courses=None, charts=None):
+        """Chart key -> PNG bytes for a dashboard selection, once every chart is rendered"""
+        return dict(self.submit(university, year, filters, courses, charts))
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'charts': len(self._charts),
+        }
+
+
+_chart_renderer = None
+_chart_renderer_lock = threading.Lock()
+
+def get_chart_renderer():
+    """Return the process-wide chart renderer over the dashboard cache"""
+    from dashboard import get_dashboard_cache
+
+    global _chart_renderer
+    with _chart_renderer_lock:
+        if _chart_renderer is None:
+            _chart_renderer = ChartRenderer(get_dashboard_cache())
+        return _chart_renderer
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Render the report charts for a dashboard selection")
+    parser.add_argument("--university")
+    parser.add_argument("--year")
+    parser.add_argument("--repeat", type=int, default=2, help="render the same selection this many times")
+    args = parser.parse_args()
+
+    renderer = get_chart_renderer()
+    try:
+        for run in range(args.repeat):
+            started = time.perf_counter()
+            charts = renderer.render(args.university, args.year)
+            print(f"Run {run + 1}: {len(charts)} charts in {time.perf_counter() - started:.2f}s")
+        print(json.dumps(renderer.stats()))
+    finally:
+        renderer.close()
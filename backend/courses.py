@@ -0,0 +1,123 @@
+import os
+import threading
+import pandas as pd
+from http_cache import PreparedResponse
+
+DATA_DIR = "../data"
+
+
+def courses_path(university):
+    return f"{DATA_DIR}/{university.lower()}/{university.lower()}_courses.xlsx"
+
+
+def _department_map(df):
+    pairs = df[['Departments', 'Courses']].dropna()
+    departments = pairs['Departments'].astype(str).str.strip()
+    courses = pairs['Courses'].astype(str).str.strip()
+    keep = (departments != '') & (courses != '')
+
+    department_course_map = {}
+    for department, course in zip(departments[keep], courses[keep]):
+        department_course_map.setdefault(department, []).append(course)
+    return department_course_map
+
+
+class CourseIndex:
+    """Courses and departments of every university, read once and held in memory.
+
+    A courses file is parsed again only when its mtime changes, and the API
+    responses built from it are serialized once per file version, so a
+    lookup costs a stat call and a dictionary hit.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, university):
+        key = university.lower()
+        path = courses_path(university)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            raise FileNotFoundError(f"Course file not found for {university}")
+
+        entry = self._entries.get(key)
+        if entry is None or entry['mtime'] != mtime:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry['mtime'] != mtime:
+                    df = pd.read_excel(path)
+                    entry = {
+                        'mtime': mtime,
+                        'courses': df['Courses'].dropna().unique().tolist(),
+                        'departments': _department_map(df),
+                        'responses': {},
+                    }
+                    self._entries[key] = entry
+                    print(f"Loaded {len(entry['courses'])} courses in {len(entry['departments'])} departments from {path}")
+        return entry
+
+    def _response(self, university, kind, build):
+        entry = self._entry(university)
+        key = (kind, university)
+        if key not in entry['responses']:
+            entry['responses'][key] = PreparedResponse(build(entry))
+        return entry['responses'][key]
+
+    def courses(self, university):
+        return self._entry(university)['courses']
+
+    def departments(self, university):
+        """Map each department of a university to its courses, in file order"""
+        return self._entry(university)['departments']
+
+    def courses_response(self, university):
+        return self._response(university, 'courses', lambda entry: {
+            "courses": entry['courses'],
+            "university": university
+        })
+
+    def departments_response(self, university):
+        return self._response(university, 'departments', lambda entry: {
+            "university": university,
+            "departments": entry['departments']
+        })
+
+    def load_all(self):
+        """Read the courses file of every university under DATA_DIR"""
+        if not os.path.isdir(DATA_DIR):
+            return []
+        universities = [name for name in sorted(os.listdir(DATA_DIR)) if os.path.exists(courses_path(name))]
+        for university in universities:
+            self._entry(university)
+        return universities
+
+
+_course_index = None
+_course_index_lock = threading.Lock()
+
+def get_course_index():
+    """Return the process-wide course index"""
+    global _course_index
+    with _course_index_lock:
+        if _course_index is None:
+            _course_index = CourseIndex()
+        return _course_index
+
+
+def read_department_courses(university):
+    """Map each department of a university to its courses, in file order"""
+    return get_course_index().departments(university)
+
+
+def department_courses(university, departments):
+    """Courses taught by any of the departments, as the dashboard's department filter selects them"""
+    if not university or university == 'All':
+        raise ValueError("Filtering by department needs a university")
+    department_course_map = read_department_courses(university)
+    unknown = [department for department in departments if department not in department_course_map]
+    if unknown:
+        raise ValueError(f"Unknown departments for {university}: {unknown}")
+    return list(dict.fromkeys(course for department in departments for course in department_course_map[department]))
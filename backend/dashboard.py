@@ -0,0 +1,359 @@
+import base64
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from http_cache import PreparedResponse
+from storage import get_storage
+
+# Dashboard columns coerced to integers, with the value used when an answer is missing
+NUMERIC_COLUMNS = {
+    'hours_per_week_university_work': 0,
+    'exercise_per_week': 0,
+    'work_hours_per_week': 0,
+    'age': 0,
+    'total_device_hours': 0,
+    'hours_socialmedia': 0,
+    'hours_between_lectures': 0,
+    'hours_per_week_lectures': 0,
+    'hours_socialising': 0,
+    'cost_of_study': 0
+}
+# Columns the aggregates are split by, or that make no sense to count
+NON_AGGREGATE_COLUMNS = ('predictions', 'actual', 'captured_at')
+PREDICTION_LABELS = ['prediction_0', 'prediction_1']
+# Results (records, aggregates) kept per storage state
+DASHBOARD_CACHE_SIZE = int(os.environ.get("DASHBOARD_CACHE_SIZE", "64"))
+
+
+def process_excel_data(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+
+    for col, default in NUMERIC_COLUMNS.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(default).astype(int)
+        else:
+            df[col] = default
+
+    for col in df.columns:
+        if col not in NUMERIC_COLUMNS:
+            df[col] = df[col].fillna('Not Provided')
+
+    return df
+
+
+def academic_years(captured_at):
+    """Academic year ('2024-2025', running 1 Sep to 31 Aug) of each 'dd.mm.yyyy HH:MM' timestamp"""
+    parts = captured_at.astype(str).str.extract(r'^(\d{1,2})\.(\d{1,2})\.(\d{4})').astype(float)
+    month, year = parts[1], parts[2]
+    start = year.where(month >= 9, year - 1)
+    years = start.astype('Int64').astype(str) + '-' + (start + 1).astype('Int64').astype(str)
+    return years.where(start.notna())
+
+
+def query_key(year=None, filters=None, courses=None):
+    """Hashable form of a dashboard filter set, for cache keys"""
+    selections = tuple(sorted(
+        (col, tuple(sorted(str(value) for value in values))) for col, values in (filters or {}).items() if values
+    ))
+    return year or None, selections, tuple(courses) if courses is not None else None
+
+
+def canonical_number(value):
+    """The same string for 21, 21.0, "21" and "21.0"; anything that is not a number is left as str(value)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if not np.isfinite(number):
+        return str(value)
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+class FilterIndex:
+    """Boolean-mask index over one dashboard view.
+
+    Each filtered column is factorized once, and the mask for a value is
+    built on first use and kept. A query ORs the masks of the values chosen
+    for a column and ANDs the columns together, the same semantics as the
+    dashboard's FilterPanel, so it never scans rows.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.size = len(frame)
+        self._codes = {}
+        self._masks = {}
+        self._numeric = set()
+        self._lock = threading.Lock()
+
+    def _factorized(self, col):
+        if col not in self._codes:
+            if col == 'academic_year':
+                values = academic_years(self.frame['captured_at'])
+            elif col in self.frame.columns:
+                column = self.frame[col]
+                if col in NUMERIC_COLUMNS or (pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)):
+                    # Numbers can be read back as floats or strings; index 21.0 as "21" so it matches a query for 21
+                    self._numeric.add(col)
+                    values = column.map(canonical_number)
+                else:
+                    values = column.astype(str)
+            else:
+                raise ValueError(f"Unknown filter column: {col}")
+            codes, uniques = pd.factorize(values)
+            self._codes[col] = codes, {value: code for code, value in enumerate(uniques)}
+        return self._codes[col]
+
+    def _canonical(self, col, value):
+        return canonical_number(value) if col in self._numeric else str(value)
+
+    def value_mask(self, col, value):
+        with self._lock:
+            codes, lookup = self._factorized(col)
+            key = (col, self._canonical(col, value))
+            if key not in self._masks:
+                code = lookup.get(key[1])
+                self._masks[key] = codes == code if code is not None else np.zeros(self.size, dtype=bool)
+            return self._masks[key]
+
+    def any_mask(self, col, values):
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            mask |= self.value_mask(col, value)
+        return mask
+
+    def mask(self, year=None, filters=None, courses=None):
+        """Rows in the academic year, matching every column filter and, if given, taking one of the courses"""
+        mask = np.ones(self.size, dtype=bool)
+        if year:
+            mask &= self.value_mask('academic_year', year)
+        if courses is not None:
+            mask &= self.any_mask('course_of_study', courses)
+        for col, values in (filters or {}).items():
+            if values:
+                mask &= self.any_mask(col, values)
+        return mask
+
+
+def encode_cursor(label):
+    return base64.urlsafe_b64encode(json.dumps({'after': label}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))['after']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _native(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _value_counts(df, columns, predictions):
+    """Value counts of every column, from one groupby over the frame melted to (column, value) pairs"""
+    long = df[columns].astype(object).melt(var_name='column', value_name='value')
+    long['prediction'] = np.tile(predictions.to_numpy(), len(columns))
+    long['actual'] = np.tile(df['actual'].astype(str).to_numpy(), len(columns))
+
+    counts = {col: {} for col in columns}
+    for (col, value, actual), count in long.groupby(['column', 'value', 'actual'], sort=False).size().items():
+        entry = counts[col].setdefault(value, {
+            'value': _native(value), 'total': 0, **{label: 0 for label in PREDICTION_LABELS}, 'actual': {}
+        })
+        entry['total'] += int(count)
+        entry['actual'][actual] = int(count)
+    for (col, value, prediction), count in long.groupby(['column', 'value', 'prediction'], sort=False).size().items():
+        if prediction:
+            counts[col][value][prediction] = int(count)
+    return {
+        col: sorted(entries.values(), key=lambda entry: entry['total'], reverse=True)
+        for col, entries in counts.items()
+    }
+
+
+def _histogram(values, predictions, bins):
+    numbers = pd.to_numeric(values, errors='coerce')
+    valid = numbers.notna()
+    if not valid.any():
+        return {'edges': [], 'total': [], **{label: [] for label in PREDICTION_LABELS}}
+    edges = np.histogram_bin_edges(numbers[valid], bins=bins)
+    histogram = {'edges': edges.tolist(), 'total': np.histogram(numbers[valid], edges)[0].tolist()}
+    for label in PREDICTION_LABELS:
+        histogram[label] = np.histogram(numbers[valid & (predictions == label)], edges)[0].tolist()
+    return histogram
+
+
+def aggregate_frame(df, bins=10):
+    """Per-column value counts, and histograms for numeric columns, split by prediction and actual answer"""
+    predictions = pd.to_numeric(df['predictions'], errors='coerce')
+    prediction_labels = pd.Series(
+        np.select([predictions == 0, predictions == 1], PREDICTION_LABELS, default=''),
+        index=df.index
+    )
+    counted = [col for col in df.columns if col not in NON_AGGREGATE_COLUMNS]
+    columns = {col: {'counts': counts} for col, counts in _value_counts(df, counted, prediction_labels).items()}
+    for col in counted:
+        if col in NUMERIC_COLUMNS:
+            columns[col]['histogram'] = _histogram(df[col], prediction_labels, bins)
+    return {
+        'total': len(df),
+        **{label: int((prediction_labels == label).sum()) for label in PREDICTION_LABELS},
+        'actual': {str(key): int(count) for key, count in df['actual'].value_counts().items()},
+        'columns': columns,
+    }
+
+
+class DashboardCache:
+    """Processed dashboard frame, per-university views and derived results, held in memory.
+
+    Everything is keyed by the storage change token, which moves on every
+    write made through this process and on any change to the data files.
+    Until it moves, a dashboard request is a dictionary lookup.
+    """
+
+    def __init__(self, storage, maxsize=DASHBOARD_CACHE_SIZE):
+        self.storage = storage
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._token = None
+        self._frame = None
+        self._views = {}
+        self._results = OrderedDict()
+
+    def _refresh(self):
+        # Take the token before reading so a write during the read forces another rebuild
+        token = self.storage.change_token()
+        if token != self._token:
+            self._frame = process_excel_data(self.storage.read_frame())
+            self._views = {}
+            self._results = OrderedDict()
+            self._token = token
+        return token
+
+    def frame(self, university=None):
+        """Processed responses, restricted to one university unless it is None or 'All'"""
+        key = university if university and university != 'All' else None
+        with self._lock:
+            self._refresh()
+            if key not in self._views:
+                self._views[key] = self._frame if key is None else self._frame[self._frame['source'] == key]
+            return self._views[key]
+
+    def cached(self, key, build):
+        """Return build() for the current storage state, computing it once per key"""
+        with self._lock:
+            token = self._refresh()
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+        result = build()
+        with self._lock:
+            if self._token == token:
+                self._results[key] = result
+                while len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+        return result
+
+    def columns(self, university=None):
+        """Columnar copy of a view: row labels, their positions and one list of values per column"""
+        def build():
+            frame = self.frame(university)
+            index = frame.index.tolist()
+            return {
+                'index': index,
+                'positions': {label: position for position, label in enumerate(index)},
+                'data': frame.to_dict('list'),
+            }
+        return self.cached(('columns', university), build)
+
+    def filter_index(self, university=None):
+        return self.cached(('filter_index', university), lambda: FilterIndex(self.frame(university)))
+
+    def selection(self, university=None, year=None, filters=None, courses=None):
+        """Positions of the view's rows matching the filters, or None when nothing is filtered"""
+        if not year and courses is None and not any((filters or {}).values()):
+            return None
+        return np.flatnonzero(self.filter_index(university).mask(year, filters, courses))
+
+    def page(self, university=None, fields=None, cursor=None, limit=None, year=None, filters=None, courses=None):
+        """Filtered rows of a view with only the requested fields, starting after the cursor row.
+
+        Cursors name the last row of the previous page, so pages stay
+        consistent while new responses are appended.
+        """
+        columnar = self.columns(university)
+        data = columnar['data']
+        fields = list(fields) if fields else list(data)
+        unknown = [field for field in fields if field not in data]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+
+        index = columnar['index']
+        selected = self.selection(university, year, filters, courses)
+        count = len(index) if selected is None else len(selected)
+        start = 0
+        if cursor is not None:
+            position = columnar['positions'].get(decode_cursor(cursor))
+            if position is None:
+                raise ValueError("Cursor does not match any row; restart from the first page")
+            start = position + 1 if selected is None else int(np.searchsorted(selected, position, side='right'))
+        end = count if limit is None else min(start + limit, count)
+
+        if selected is None:
+            columns = [data[field][start:end] for field in fields]
+        else:
+            chosen = selected[start:end].tolist()
+            columns = [[data[field][i] for i in chosen] for field in fields]
+        result = {'data': [dict(zip(fields, values)) for values in zip(*columns)]}
+        if limit is not None:
+            result['next_cursor'] = None
+            if end < count:
+                last = end - 1 if selected is None else selected[end - 1]
+                result['next_cursor'] = encode_cursor(index[last])
+            result['total'] = count
+        return result
+
+    def page_response(self, university=None, fields=None, cursor=None, limit=None, year=None, filters=None, courses=None):
+        """Serialized /api/dashboard body"""
+        key = ('page', university, tuple(fields) if fields else None, cursor, limit, query_key(year, filters, courses))
+        return self.cached(key, lambda: PreparedResponse(self.page(university, fields, cursor, limit, year, filters, courses)))
+
+    def aggregates(self, university=None, year=None, filters=None, bins=10, courses=None):
+        def build():
+            frame = self.frame(university)
+            selected = self.selection(university, year, filters, courses)
+            return aggregate_frame(frame if selected is None else frame.iloc[selected], bins=bins)
+        return self.cached(('aggregates', university, query_key(year, filters, courses), bins), build)
+
+    def aggregates_response(self, university=None, year=None, filters=None, bins=10, courses=None):
+        """Serialized /api/dashboard/aggregates body"""
+        key = ('aggregates_response', university, query_key(year, filters, courses), bins)
+        return self.cached(key, lambda: PreparedResponse(self.aggregates(university, year, filters, bins, courses)))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'results': len(self._results),
+            'views': [key or 'All' for key in self._views],
+        }
+
+
+_dashboard_cache = None
+_dashboard_cache_lock = threading.Lock()
+
+def get_dashboard_cache():
+    """Return the process-wide dashboard cache over the configured storage"""
+    global _dashboard_cache
+    with _dashboard_cache_lock:
+        if _dashboard_cache is None:
+            _dashboard_cache = DashboardCache(get_storage())
+        return _dashboard_cache
@@ -0,0 +1,52 @@
+import pandas as pd
+
+
+class CategoricalEncoder:
+    """Fixed vocabularies for categorical answers, encoded with one categorical lookup per column.
+
+    Codes are positions in the sorted vocabulary, the same codes LabelEncoder
+    produces. Missing answers take the column's most frequent training value.
+    Values outside the vocabulary are either mapped the same way
+    (handle_unknown='most_frequent') or rejected (handle_unknown='error').
+    """
+
+    def __init__(self, columns, handle_unknown='most_frequent'):
+        if handle_unknown not in ('most_frequent', 'error'):
+            raise ValueError(f"Unsupported handle_unknown: {handle_unknown}")
+        self.columns = list(columns)
+        self.handle_unknown = handle_unknown
+        self.vocabularies = {}
+        self.fill_values = {}
+        self.unknown_counts = {col: 0 for col in self.columns}
+
+    def fit(self, df):
+        for col in self.columns:
+            counts = df[col].dropna().astype(str).value_counts()
+            if counts.empty:
+                raise ValueError(f"Cannot fit vocabulary for '{col}': no answers")
+            # Ties resolve to the smallest value, like Series.mode()
+            fill_value = min(counts.index[counts == counts.max()])
+            self.fill_values[col] = fill_value
+            self.vocabularies[col] = sorted(counts.index)
+        return self
+
+    def transform(self, df):
+        encoded = {}
+        for col in self.columns:
+            fill_value = self.fill_values[col]
+            values = df[col].astype(str).where(df[col].notna(), fill_value)
+            codes = pd.Categorical(values, categories=self.vocabularies[col]).codes
+            unknown = codes == -1
+            if unknown.any():
+                unknown_values = sorted(set(values[unknown]))
+                if self.handle_unknown == 'error':
+                    raise ValueError(f"Unknown categories in '{col}': {unknown_values}")
+                self.unknown_counts[col] += int(unknown.sum())
+                print(f"Encoded {int(unknown.sum())} unknown '{col}' values {unknown_values[:5]} as '{fill_value}'")
+                codes = codes.copy()
+                codes[unknown] = self.vocabularies[col].index(fill_value)
+            encoded[col] = codes
+        return pd.DataFrame(encoded, index=df.index)
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
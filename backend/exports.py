@@ -0,0 +1,133 @@
+import os
+import tempfile
+from openpyxl import Workbook
+import pandas as pd
+from dashboard import NUMERIC_COLUMNS, FilterIndex, process_excel_data
+from storage import COLUMN_IDS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows read from storage, filtered and written at a time
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "5000"))
+# Size of the pieces a finished XLSX or Parquet file is sent in
+STREAM_BLOCK_BYTES = 1024 * 1024
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FILTER_COLUMNS = set(COLUMN_IDS) | {'academic_year'}
+
+
+def filtered_chunks(storage, source=None, year=None, filters=None, courses=None, chunksize=EXPORT_CHUNK_ROWS):
+    """Stored responses in chunks, keeping the rows the dashboard would show for the same filters"""
+    filtering = bool(year) or courses is not None or any((filters or {}).values())
+    for chunk in storage.iter_frames(source=source, chunksize=chunksize):
+        if filtering:
+            # Match on processed values, as the dashboard does, but export the stored ones
+            chunk = chunk[FilterIndex(process_excel_data(chunk)).mask(year, filters, courses)]
+        if len(chunk):
+            yield chunk.reindex(columns=COLUMN_IDS)
+
+
+def _csv_blocks(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+    if header:
+        yield (','.join(COLUMN_IDS) + '\n').encode('utf-8')
+
+
+def _file_blocks(path):
+    try:
+        with open(path, 'rb') as f:
+            while block := f.read(STREAM_BLOCK_BYTES):
+                yield block
+    finally:
+        os.remove(path)
+
+
+def _temporary_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def _xlsx_value(value):
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(item) for item in value)
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _xlsx_blocks(chunks, questions):
+    # Write-only mode streams rows to a temporary file instead of holding the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    # Same two header rows (questions, column IDs) as the other spreadsheets
+    sheet.append([questions.get(col_id, col_id) for col_id in COLUMN_IDS])
+    sheet.append(COLUMN_IDS)
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([_xlsx_value(value) for value in row])
+    path = _temporary_path('.xlsx')
+    workbook.save(path)
+    yield from _file_blocks(path)
+
+
+def _parquet_schema():
+    numeric = set(NUMERIC_COLUMNS) | {'predictions'}
+    return pyarrow.schema([
+        (col_id, pyarrow.float64() if col_id in numeric else pyarrow.string()) for col_id in COLUMN_IDS
+    ])
+
+
+def _parquet_table(chunk, schema):
+    columns = {}
+    for field in schema:
+        values = chunk[field.name]
+        if pyarrow.types.is_floating(field.type):
+            columns[field.name] = pd.to_numeric(values, errors='coerce')
+        else:
+            columns[field.name] = values.astype(str).where(values.notna(), None)
+    return pyarrow.Table.from_pandas(pd.DataFrame(columns), schema=schema, preserve_index=False)
+
+
+def _parquet_blocks(chunks):
+    schema = _parquet_schema()
+    path = _temporary_path('.parquet')
+    # One row group per chunk
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(_parquet_table(chunk, schema))
+    yield from _file_blocks(path)
+
+
+def export_stream(storage, format='csv', source=None, year=None, filters=None, courses=None):
+    """Check an export request and return (body iterator, media type, file extension).
+
+    Everything that can be rejected is checked here, before the first byte
+    is sent; the iterator reads and writes one chunk of rows at a time.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {format}; use one of {sorted(EXPORT_MEDIA_TYPES)}")
+    if format == 'parquet' and pyarrow is None:
+        raise ValueError("Parquet export needs the pyarrow package")
+    unknown = [col for col, values in (filters or {}).items() if values and col not in FILTER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown filter columns: {unknown}")
+
+    chunks = filtered_chunks(storage, source, year, filters, courses)
+    if format == 'csv':
+        body = _csv_blocks(chunks)
+    elif format == 'xlsx':
+        body = _xlsx_blocks(chunks, storage.question_headers())
+    else:
+        body = _parquet_blocks(chunks)
+    return body, EXPORT_MEDIA_TYPES[format], format
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PreparedResponse:
+    """JSON body serialized once, with a content-hash ETag and compressed variants made on demand.
+
+    Keep instances in a cache next to the data they were built from; every
+    request for unchanged data then costs a header comparison, and a 304 when
+    the client already holds the body.
+    """
+
+    def __init__(self, payload, media_type='application/json'):
+        self.body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.media_type = media_type
+        # Weak, so the same tag validates the identity, gzip and brotli bodies
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+        self._encoded = {}
+
+    def matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in tags)
+
+    def encoded(self, encoding):
+        if encoding not in self._encoded:
+            if encoding == 'br':
+                self._encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self._encoded[encoding]
+
+    def response(self, request):
+        headers = {'ETag': self.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if self.matches(request.headers.get('if-none-match')):
+            return Response(status_code=304, headers=headers)
+
+        body = self.body
+        if len(body) >= COMPRESS_MIN_BYTES:
+            accepted = _accepted_encodings(request.headers.get('accept-encoding'))
+            encoding = 'br' if brotli is not None and 'br' in accepted else 'gzip' if 'gzip' in accepted else None
+            if encoding:
+                body = self.encoded(encoding)
+                headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+class JobQueue:
+    """In-process job queue drained by asyncio workers.
+
+    Jobs are plain blocking callables; workers run them in the default thread
+    pool so the event loop stays free. Jobs submitted with a coalesce_key
+    share a single queued job until a worker picks it up. The number of
+    workers is the number of jobs that run at once.
+    """
+
+    def __init__(self, name, workers=1, max_history=1000):
+        self.name = name
+        self.workers = workers
+        self.max_history = max_history
+        self.jobs = OrderedDict()
+        self._pending = {}
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        print(f"Started {self.workers} worker(s) for {self.name} jobs")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, func, *args, kind=None, coalesce_key=None, with_progress=False, **kwargs):
+        """Queue func(*args, **kwargs) and return the job ID.
+
+        With with_progress=True, func is also passed progress(fraction, stage)
+        to report how far it has got; both show up in the job status.
+        """
+        if self._queue is None:
+            raise RuntimeError(f"{self.name} job queue has not been started")
+
+        if coalesce_key is not None and coalesce_key in self._pending:
+            return self._pending[coalesce_key]
+
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind or self.name,
+            "status": "queued",
+            "submitted_at": datetime.now().isoformat(timespec="seconds"),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "progress": 0.0,
+            "stage": None,
+        }
+        if with_progress:
+            kwargs["progress"] = lambda fraction, stage=None: self._set_progress(job_id, fraction, stage)
+        if coalesce_key is not None:
+            self._pending[coalesce_key] = job_id
+        self._queue.put_nowait((job_id, coalesce_key, func, args, kwargs))
+        self._trim_history()
+        return job_id
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def _set_progress(self, job_id, fraction, stage=None):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["progress"] = round(min(max(fraction, 0.0), 1.0), 3)
+            job["stage"] = stage
+
+    def _trim_history(self):
+        while len(self.jobs) > self.max_history:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] in ("queued", "running"):
+                break
+            self.jobs.pop(oldest_id)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, coalesce_key, func, args, kwargs = await self._queue.get()
+            if coalesce_key is not None and self._pending.get(coalesce_key) == job_id:
+                del self._pending[coalesce_key]
+
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat(timespec="seconds")
+            try:
+                job["result"] = await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+                job["status"] = "finished"
+                job["progress"] = 1.0
+            except Exception as e:
+                print(f"{self.name} job {job_id} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+                self._queue.task_done()
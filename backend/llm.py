@@ -0,0 +1,177 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+import httpx
+from groq import Groq
+from models import grok_key
+
+# groq, or fake for offline runs and load tests
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "groq").lower()
+# Seconds to wait for a response or the next streamed chunk, and for a whole completion including retries
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "120"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+# Connections kept open to the LLM API, shared by every report
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "10"))
+# Seconds the fake backend takes per completion, and the share of its attempts that fail
+FAKE_LLM_DELAY = float(os.environ.get("FAKE_LLM_DELAY", "0"))
+FAKE_LLM_FAILURE_RATE = float(os.environ.get("FAKE_LLM_FAILURE_RATE", "0"))
+
+SYSTEM_PROMPT = "You are a professional report writer specializing in mental health analysis. Format your response in clear sections with headers. Focus on analyzing the data based on the prediction values (0 or 1) indicating mental health issues."
+
+
+class LLMError(RuntimeError):
+    """A completion failed or did not finish before its deadline"""
+
+
+class LLMClient(ABC):
+    """Chat completion client with a deadline per call and bounded retries.
+
+    Backends implement _stream_once, which yields the completion in pieces
+    for one attempt. Failed attempts are retried with exponential backoff
+    while nothing has been yielded yet and the deadline allows; any other
+    failure is raised as LLMError.
+    """
+
+    model = None
+    temperature = 0.7
+    max_tokens = 4000
+    system_prompt = SYSTEM_PROMPT
+
+    def __init__(self, timeout=LLM_TIMEOUT, deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+
+    @abstractmethod
+    def _stream_once(self, prompt, timeout):
+        """Yield the pieces of one completion attempt, giving up after timeout seconds"""
+
+    def _retryable(self, error):
+        return True
+
+    def stream(self, prompt, deadline=None):
+        """Yield the completion as it arrives"""
+        deadline = deadline or self.deadline
+        deadline_at = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMError(f"No completion from {self.model} within {deadline:.0f}s")
+            started = False
+            try:
+                for piece in self._stream_once(prompt, timeout=min(self.timeout, remaining)):
+                    if time.monotonic() > deadline_at:
+                        raise LLMError(f"Completion from {self.model} did not finish within {deadline:.0f}s")
+                    started = True
+                    yield piece
+                return
+            except LLMError:
+                raise
+            except Exception as e:
+                # Pieces already yielded cannot be taken back, so only clean failures are retried
+                if started or attempt >= self.max_retries or not self._retryable(e):
+                    raise LLMError(f"Completion from {self.model} failed after {attempt + 1} attempt(s): {e}") from e
+                backoff = min(2 ** attempt * (1 + random.random()), max(deadline_at - time.monotonic(), 0))
+                print(f"LLM attempt {attempt + 1} failed ({e}); retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+                attempt += 1
+
+    def complete(self, prompt, deadline=None):
+        return ''.join(self.stream(prompt, deadline))
+
+
+class GroqLLM(LLMClient):
+    """Groq chat completions over one pooled HTTP client"""
+
+    model = "llama-3.1-8b-instant"
+
+    def __init__(self, pool_size=LLM_POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        http_client = httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        # Retries are handled by stream(), which knows the deadline
+        self.client = Groq(
+            api_key=os.environ.get("GROQ_API_KEY") or grok_key,
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=http_client
+        )
+
+    def _stream_once(self, prompt, timeout):
+        chunks = self.client.chat.completions.create(
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            model=self.model,
+            stream=True,
+            timeout=timeout
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _retryable(self, error):
+        # Rate limits, timeouts and server errors are worth another try; bad requests are not
+        status = getattr(error, 'status_code', None)
+        return status is None or status >= 500 or status in (408, 409, 429)
+
+
+class FakeLLM(LLMClient):
+    """Offline backend that streams a canned narrative derived from the prompt.
+
+    It spreads FAKE_LLM_DELAY seconds over the streamed words and fails
+    FAKE_LLM_FAILURE_RATE of its attempts, so the report pipeline can be
+    run and load-tested without network access.
+    """
+
+    model = "fake"
+    SECTIONS = [
+        "Executive Summary", "Demographic Analysis", "Academic Factors Analysis", "Financial Analysis",
+        "Lifestyle Analysis", "Psychological and Social Analysis", "Percentages Summary", "Key Findings",
+        "Recommendations",
+    ]
+
+    def __init__(self, delay=FAKE_LLM_DELAY, failure_rate=FAKE_LLM_FAILURE_RATE, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.failure_rate = failure_rate
+
+    def _stream_once(self, prompt, timeout):
+        if random.random() < self.failure_rate:
+            raise ConnectionError("Simulated LLM failure")
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        text = '\n\n'.join(
+            f"{number}. {section}\nPlaceholder analysis {digest}-{number} generated offline by the fake LLM backend."
+            for number, section in enumerate(self.SECTIONS, start=1)
+        )
+        words = text.split(' ')
+        for position, word in enumerate(words):
+            if self.delay:
+                time.sleep(self.delay / len(words))
+            yield word if position == len(words) - 1 else word + ' '
+
+
+LLM_BACKENDS = {'groq': GroqLLM, 'fake': FakeLLM}
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Return the process-wide LLM client selected by LLM_BACKEND"""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            if LLM_BACKEND not in LLM_BACKENDS:
+                raise ValueError(f"Unsupported LLM backend: {LLM_BACKEND}")
+            _llm_client = LLM_BACKENDS[LLM_BACKEND]()
+        return _llm_client
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "../data/llm_cache")
+# Seconds a narrative is reused for, and the size the cache is trimmed to
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def completion_params(client):
+    """Settings of an LLM client that change its completions"""
+    return {
+        'model': getattr(client, 'model', type(client).__name__),
+        'temperature': getattr(client, 'temperature', None),
+        'max_tokens': getattr(client, 'max_tokens', None),
+        'system_prompt': getattr(client, 'system_prompt', None),
+    }
+
+
+def cache_key(prompt, **params):
+    """SHA-256 of the prompt and the completion settings"""
+    canonical = json.dumps({'prompt': prompt, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class NarrativeCache:
+    """Content-addressed store of LLM completions, one JSON file per prompt hash.
+
+    Entries expire after ttl seconds. When the files exceed max_bytes the
+    least recently used are removed; a hit refreshes the file's mtime. The
+    files are written atomically, so API processes and scripts can share
+    the directory.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry['created_at'] > self.ttl:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return entry['text']
+
+    def put(self, key, text, **params):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {'created_at': time.time(), **params, 'text': text}
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove expired entries, then the least recently used until the cache fits in max_bytes"""
+        with self._lock:
+            now = time.time()
+            # mtime is refreshed on every hit, so it only bounds the age of entries never used again;
+            # get() checks created_at for the rest
+            entries = []
+            for mtime, size, path in self._entries():
+                if now - mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    entries.append((mtime, size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+
+_narrative_cache = None
+_narrative_cache_lock = threading.Lock()
+
+def get_narrative_cache():
+    """Return the process-wide narrative cache"""
+    global _narrative_cache
+    with _narrative_cache_lock:
+        if _narrative_cache is None:
+            _narrative_cache = NarrativeCache()
+        return _narrative_cache
+
+
+class CachedLLM:
+    """Wraps an LLM client so a prompt it has answered before is served from the narrative cache.
+
+    The client needs a stream(prompt) method that raises on failure; a
+    completion is stored only once it has streamed to the end.
+    """
+
+    def __init__(self, client, cache=None):
+        self.client = client
+        self.cache = cache or get_narrative_cache()
+        self.model = getattr(client, 'model', None)
+
+    def stream(self, prompt):
+        params = completion_params(self.client)
+        key = cache_key(prompt, **params)
+        text = self.cache.get(key)
+        if text is not None:
+            print(f"Narrative served from cache ({key[:12]})")
+            yield text
+            return
+        pieces = []
+        for piece in self.client.stream(prompt):
+            pieces.append(piece)
+            yield piece
+        self.cache.put(key, ''.join(pieces), **params)
+
+    def complete(self, prompt):
+        return ''.join(self.stream(prompt))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM narrative cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="show the number and size of cached narratives")
+    subparsers.add_parser("clear", help="remove every cached narrative")
+    args = parser.parse_args()
+
+    cache = get_narrative_cache()
+    if args.command == "clear":
+        cache.clear()
+    print(json.dumps(cache.stats()))
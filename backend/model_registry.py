@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from datetime import datetime
+import joblib
+
+MODEL_DIR = os.environ.get("MODEL_DIR", ".")
+BUNDLE_DIR = os.environ.get("BUNDLE_DIR", "../data/models")
+MODEL_NAMES = [
+    'RandomForest_original', 'RandomForest_smote',
+    'NeuralNetwork_original', 'NeuralNetwork_smote'
+]
+# Model trained into new bundles by default
+ACTIVE_MODEL = os.environ.get("ACTIVE_MODEL", "NeuralNetwork_smote")
+
+
+def load_artifact(path):
+    """Load a joblib artifact and record how long it took and the size of its file.
+
+    The file size stands in for the memory the artifact holds; measuring
+    allocations would need process-wide tracing around every load.
+    """
+    started = time.perf_counter()
+    artifact = joblib.load(path)
+    return artifact, {
+        'path': path,
+        'mtime': os.path.getmtime(path),
+        'loaded_at': datetime.now().isoformat(timespec='seconds'),
+        'load_seconds': time.perf_counter() - started,
+        'file_bytes': os.path.getsize(path),
+    }
+
+
+class ModelRegistry:
+    """Serialized models and the active model bundle, loaded once and held in memory.
+
+    The .sav models provide hyperparameters for training and are loaded on
+    first use; predictions are only ever made with the bundle named in
+    BUNDLE_DIR/LATEST, which is loaded up front. Entries are replaced
+    by swapping whole objects, so readers always see either the old or the new
+    artifacts, never a half-loaded one.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, bundle_dir=BUNDLE_DIR, model_names=MODEL_NAMES):
+        self.model_dir = model_dir
+        self.bundle_dir = bundle_dir
+        self.model_names = list(model_names)
+        self._lock = threading.Lock()
+        self._models = {}
+        self._bundle = None
+
+    def model_path(self, name):
+        return os.path.join(self.model_dir, f'{name}_model.sav')
+
+    def _load_entry(self, name):
+        model, stats = load_artifact(self.model_path(name))
+        return {'model': model, **stats}
+
+    def _latest_bundle_version(self):
+        latest_path = os.path.join(self.bundle_dir, 'LATEST')
+        if not os.path.exists(latest_path):
+            return None
+        with open(latest_path, encoding='utf-8') as f:
+            return f.read().strip() or None
+
+    def _refresh_bundle(self, force=False):
+        version = self._latest_bundle_version()
+        current = self._bundle['version'] if self._bundle else None
+        if version == current and not force:
+            return False
+        if version is None:
+            self._bundle = None
+            return True
+        bundle, stats = load_artifact(os.path.join(self.bundle_dir, f'{version}.joblib'))
+        self._bundle = {**bundle, **stats, 'name': f"bundle:{version}"}
+        print(f"Loaded model bundle {version} in {stats['load_seconds']:.3f}s ({stats['file_bytes'] / 1024:.0f} KiB on disk)")
+        return True
+
+    def refresh_bundle(self, force=False):
+        """Load the active bundle if LATEST names a different one; cheap enough for every scoring run"""
+        with self._lock:
+            return self._refresh_bundle(force)
+
+    def refresh(self, force=False):
+        """Reload the active bundle and any loaded model whose file changed since it was loaded"""
+        with self._lock:
+            models = dict(self._models)
+            changed = []
+            for name, current in list(models.items()):
+                path = self.model_path(name)
+                if not os.path.exists(path):
+                    del models[name]
+                    changed.append(name)
+                    print(f"Unloaded {name}: model file removed")
+                elif force or current['mtime'] != os.path.getmtime(path):
+                    models[name] = self._load_entry(name)
+                    changed.append(name)
+                    print(f"Loaded {name} in {models[name]['load_seconds']:.3f}s ({models[name]['file_bytes'] / 1024:.0f} KiB on disk)")
+            self._models = models
+            if self._refresh_bundle(force):
+                changed.append('bundle')
+        return changed
+
+    def available_models(self):
+        """Names of the models with a .sav file, whether loaded yet or not"""
+        return [name for name in self.model_names if os.path.exists(self.model_path(name))]
+
+    def get(self, name):
+        """Return a .sav model, loading it on first use or after its file changed"""
+        path = self.model_path(name)
+        with self._lock:
+            if not os.path.exists(path):
+                self._models.pop(name, None)
+                raise FileNotFoundError(f"No such file or directory: '{path}'")
+            entry = self._models.get(name)
+            if entry is None or entry['mtime'] != os.path.getmtime(path):
+                entry = self._load_entry(name)
+                self._models = {**self._models, name: entry}
+                print(f"Loaded {name} in {entry['load_seconds']:.3f}s ({entry['file_bytes'] / 1024:.0f} KiB on disk)")
+            return entry['model']
+
+    def pipeline(self):
+        """Return the scoring pipeline of the active bundle, or None before any training"""
+        bundle = self._bundle
+        return bundle['pipeline'] if bundle else None
+
+    def bundle_info(self):
+        bundle = self._bundle
+        if bundle is None:
+            return None
+        return {key: bundle[key] for key in ('version', 'model_name', 'created_at', 'feature_order', 'metrics')}
+
+    def stats(self):
+        entries = list(self._models.items())
+        if self._bundle is not None:
+            entries.append((self._bundle['name'], self._bundle))
+        return [
+            {
+                'name': name,
+                'path': entry['path'],
+                'loaded_at': entry['loaded_at'],
+                'load_seconds': round(entry['load_seconds'], 4),
+                'file_bytes': entry['file_bytes'],
+            }
+            for name, entry in entries
+        ]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Return the process-wide model registry, loading the active bundle on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+            _registry.refresh()
+        return _registry
@@ -9,37 +9,6 @@ with open('api_key.json') as f:
     antropic_key = api_keys['antropic_key']
     grok_key = api_keys['grok_key']
 
-from groq import Groq
-
-class GroqClient:
-    def __init__(self):
-        self.client = Groq(
-            api_key=os.environ.get("GROQ_API_KEY") if os.environ.get("GROQ_API_KEY") else grok_key
-        )
-
-    def generate_report(self, prompt: str) -> str:
-        try:
-            response = self.client.chat.completions.create(
-                max_tokens=4000,
-                temperature=0.7,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional report writer specializing in mental health analysis. Format your response in clear sections with headers. Focus on analyzing the data based on the prediction values (0 or 1) indicating mental health issues."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.1-8b-instant"
-            )
-            return response.choices[0].message.content
-
-        except Exception as e:
-            print(f"Error generating report: {e}")
-            return f"Error generating report: {str(e)}"
-
 class QuestionnaireDataModel(BaseModel):
     answers: List[dict]
     source: str
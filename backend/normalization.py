@@ -0,0 +1,372 @@
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NORMALIZATION_CACHE_SIZE = int(os.environ.get("NORMALIZATION_CACHE_SIZE", "4096"))
+
+VALUE_MAPPINGS = {
+    'diet': {
+        'I think my diet is somewhat in-between': 'Somewhat Inbetween',
+        'I think my diet is somewhat inbetween': 'Somewhat Inbetween',
+        'Yes, I think my diet is healthy': 'Healthy',
+        'No, I think my diet is unhealthy': 'Unhealthy'
+    },
+    'ethnic_group': {
+        'White': 'White',
+        'Black/African/Caribbean/Black British': 'Black',
+        'Asian/Asian British': 'Asian',
+        'Mixed/multiple ethnic groups': 'Mixed',
+        'Other ethnic group': 'Other'
+    },
+    'family_earning_class': {
+        'Lower class (less than £25000 per annum)': 'Lower Class (below £25,000)',
+        'Lower class (below £25,000)': 'Lower Class (below £25,000)',
+        'Lower class': 'Lower Class (below £25,000)',
+        'Middle class (between £25k and £90K)': 'Middle Class (£25,000-£54,999)',
+        'Middle class (£25,000-£54,999)': 'Middle Class (£25,000-£54,999)',
+        'Middle class': 'Middle Class (£25,000-£54,999)',
+        'Higher class (£90001 or above per annum)': 'Higher Class (£55,000-£90,000)',
+        'Higher class (£55,000-£90,000)': 'Higher Class (£55,000-£90,000)',
+        'Higher class': 'Higher Class (£55,000-£90,000)',
+        'Upper higher class (above £90,000)': 'Upper Higher Class (above £90,000)'
+    },
+    'quality_of_life': {
+        'Medium quality of life': 'Medium',
+        'Low quality of life': 'Low',
+        'High quality of life': 'High',
+        'Very Low quality of life': 'Very Low',
+        'Very High quality of life': 'Very High'
+    },
+    'alcohol_consumption': {
+        'My alcohol consumption is moderate': 'Moderate',
+        "I don't drink alcohol": 'No Drinks',
+        'My alcohol consumption is below moderate': 'Below Moderate',
+        'My alcohol consumption is above moderate': 'Above Moderate'
+    },
+    'personality_type': {
+        'Introvert (a quiet person who is more interested in their own thoughts and feelings than spending time with other people)': 'Introvert',
+        'Extrovert (a lively and confident person who enjoys being with other people)': 'Extrovert',
+        'Somewhat in between': 'Somewhat in-between'
+    },
+    'stress_in_general': {
+        'Yes (due to employment-related issues)': 'Yes',
+        'Yes (due to other circumstances, such as health, family issues, etc)': 'Yes',
+        'Yes (due to university work)': 'Yes',
+        'No': 'No',
+        'Yes': 'Yes',
+        'Yes (due to other circumstances, such as health, family issues, etc),No': 'Yes',
+        'Yes (due to other circumstances, such as health, family issues, etc), Yes (due to university work)': 'Yes',
+        'Yes (due to employment-related issues), Yes (due to other circumstances, such as health, family issues, etc)': 'Yes',
+        'Yes (due to employment-related issues),Yes (due to other circumstances, such as health, family issues, etc),Yes (due to university work)': 'Yes',
+        'Yes (due to university work),No': 'Yes',
+        'Yes (due to employment-related issues), Yes (due to university work)': 'Yes'
+    },
+    'stress_before_exams': {
+        'Yes (due to university work)': 'Yes',
+        'Yes (due to employment-related issues)': 'Yes',
+        'Yes (due to other circumstances such as health, family issues, etc)': 'Yes',
+        'Yes': 'Yes',
+        'No': 'No',
+        "I don't have exams": 'No',
+        "I don't normally have exams": 'No',
+        'No (I am not stressed)': 'No'
+    },
+    'well_hydrated': {'Yes': 'Yes', 'No': 'No'},
+    'financial_problems': {'Yes': 'Yes', 'No': 'No'},
+    'feel_afraid': {
+        'Very frequently': 'Very Frequently',
+        'Rarely': 'Rarely',
+        'Never': 'Never',
+        'Occasionally': 'Occasionally',
+        'Very rarely': 'Very Rarely',
+        'Frequently': 'Frequently',
+        'nan': 'Not Provided'
+    },
+    'timetable_preference': {
+        'I prefer my timetable to be compact. (having all my classes in one day or two days in the week)': 'Compact',
+        'I prefer my timetable to be spread with long gaps in between classes (eg, 1-2 modules per day, spread over 3 times per week)': 'Spread'
+    },
+    'timetable_impact': {
+        'Yes': 'Yes',
+        'No': 'No',
+        'Not completed': 'No',
+        'Yes, on my life, health and studies': 'Yes',
+        'Yes, on my studies': 'Yes',
+        'Yes, on my life and health': 'Yes',
+        'No, it has no impact on my studies, life or health': 'No'
+    },
+    'student_type_time': {
+        'I am a part-time student': 'Part Time',
+        'I am a full-time student': 'Full Time',
+        'I am unsure': "Don't Know"
+    },
+    'student_type_location': {
+        'Home Student': 'Home student',
+        'European Student': 'European student',
+        'International Student': 'International student'
+    },
+    'form_of_employment': {
+        'I am unemployed': 'Unemployed',
+        'Yes, I am part-time employed': 'Part Time',
+        'I am self-employed': 'Self Employed',
+        'Yes, I am full-time employed': 'Full Time'
+    },
+    'sense_of_belonging': {
+        "I don't know yet": "Don't Know",
+        "I don't know how to answer this question": "Don't Know",
+        'A little': 'Little',
+        'Very much': 'Very Much'
+    },
+    'physical_activities': {
+        'Yes, it helps a lot': 'Yes',
+        'Yes, it sometimes helps': 'Yes',
+        "I don't do physical activity": "Don't Know",
+        "I've not really noticed if it helps or not": "Don't Know",
+        'No, it does not help': 'No'
+    },
+    'level_of_study': {
+        'Level 4': 'Level 4',
+        'Level 4 ': 'Level 4',
+        'Level 4 (first year, undergraduate)': 'Level 4',
+        'Level 4 Foundation year': 'Level 4',
+        'Foundation year': 'Level 4',
+        'Level 5 (second year, undergraduate)': 'Level 5',
+        'Level 6 (third year, undergraduate)': 'Level 6',
+        'Level 7': 'Level 7',
+        'Level 7 ': 'Level 7',
+        'Level 7 (postgraduate)': 'Level 7',
+        'Others': 'Other',
+        'Other': 'Other'
+    },
+    'actual': {'Yes': 'Yes', 'No': 'No'},
+    'gender': {
+        'Male': 'Male',
+        'Female': 'Female',
+        'Other': 'Other',
+        'prefer not to say': 'Prefer not to say',
+        'Prefer not to say': 'Prefer not to say',
+        'Non-binary / LGBTQ+': 'Other'
+    }
+}
+
+COUNTRY_MAPPING = {
+    # UK variations
+    'UK': 'United Kingdom',
+    'Uk': 'United Kingdom',
+    'uk': 'United Kingdom',
+    'England': 'United Kingdom',
+    'England ': 'United Kingdom',
+    'Wales': 'United Kingdom',
+    'United Kingdom ': 'United Kingdom',
+
+    # US variations
+    'us': 'United States',
+    'America ': 'United States',
+
+    # Asia
+    'china': 'China',
+    'China ': 'China',
+    'sri lanka': 'Sri Lanka',
+    'Sri lanka': 'Sri Lanka',
+    'Viet Nam': 'Vietnam',
+    'Korea, Republic of': 'South Korea',
+    'Myanmar': 'Myanmar',
+    'Philippines ': 'Philippines',
+
+    # Europe
+    'slovakia': 'Slovakia',
+    'serbia': 'Serbia',
+    'Russian Federation': 'Russia',
+    'Moldova, Republic of': 'Moldova',
+
+    # Middle East
+    'Iran, Islamic Republic Of': 'Iran',
+    'from Egypt, based in saudi': 'Saudi Arabia',
+    'Yemen ': 'Yemen',
+
+    # Africa
+    'Tanzania, United Republic of': 'Tanzania',
+    'nig': 'Nigeria',
+
+    # Special territories
+    'Hong Kong': 'Hong Kong SAR',
+    'Falkland Islands (Malvinas)': 'Falkland Islands',
+    'Bangladesh - born England': 'United Kingdom',
+
+    # Clean spaces
+    'India ': 'India',
+    'Greece ': 'Greece'
+}
+
+# Degree types in priority order; the first pattern found in the upper-cased course wins
+COURSE_PATTERNS = [
+    (label, re.compile('|'.join(re.escape(token) for token in tokens)))
+    for label, tokens in [
+        ('Foundation', ['FOUNDATION']),
+        ('BSc', ['BSC', 'BACHELOR OF SCIENCE']),
+        ('BA', ['BA', 'BACHELOR OF ARTS']),
+        ('MSc', ['MSC', 'MASTER OF SCIENCE']),
+        ('MA', ['MA ', 'MASTER OF ARTS']),
+        ('BEng', ['BENG', 'BACHELOR OF ENGINEERING']),
+        ('FdSc', ['FDSC']),
+        ('MBA', ['MBA']),
+        ('MRes', ['MRES']),
+        ('HNC/HND', ['HNC', 'HND']),
+        ('LLB', ['LLB']),
+        ('BMus', ['BMUS']),
+        ('Apprenticeship', ['APPRENTICESHIP']),
+        ('Exchange', ['STUDY ABROAD', 'EXCHANGES']),
+    ]
+]
+
+# Any lower-cased stress answer matching this counts as 'Yes'
+STRESS_YES_PATTERN = re.compile('yes|stressed')
+
+
+def clean_numeric_values(value):
+    try:
+        if isinstance(value, str):
+            value = value.replace(',', '')
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def normalize_country(values):
+    """Standardize a Series of country names"""
+    stripped = values.astype(str).str.strip()
+    standardized = stripped.map(COUNTRY_MAPPING).fillna(stripped.str.title())
+    return standardized.where(values.notna(), 'Unknown')
+
+
+def normalize_course(values):
+    """Standardize a Series of course names to degree types"""
+    courses = values.astype(str).str.upper().str.strip()
+    conditions = [courses.str.contains(pattern) for _, pattern in COURSE_PATTERNS]
+    labels = [label for label, _ in COURSE_PATTERNS]
+    standardized = pd.Series(np.select(conditions, labels, default='Other'), index=values.index, dtype=object)
+    return standardized.where(values.notna(), 'Other')
+
+
+def normalize_stress(values):
+    """Convert a Series of stress-related responses to Yes/No"""
+    answers = values.astype(str).str.lower()
+    standardized = pd.Series(np.where(answers.str.contains(STRESS_YES_PATTERN), 'Yes', 'No'), index=values.index, dtype=object)
+    missing = values.isna() | (values == 'nan')
+    return standardized.where(~missing, 'No')
+
+
+# Key standing in for missing answers, which cannot be cache keys themselves
+_MISSING = object()
+
+
+class Normalizer:
+    """Normalization of raw answers shared by the merger, the processor and the reports.
+
+    Each rule ("kind") maps a Series of raw values to normalized ones. Results
+    are memoized per (kind, raw value) in a bounded LRU cache, so a distinct
+    answer is normalized once per process no matter how many rows or frames
+    repeat it. Answers with no entry in a mapping table are logged once.
+    """
+
+    def __init__(self, maxsize=NORMALIZATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.unmapped = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.rules = {
+            'country': normalize_country,
+            'course': self._course_rule,
+            'stress': normalize_stress,
+            'numeric': lambda values: values.map(clean_numeric_values),
+        }
+        for column, mapping in VALUE_MAPPINGS.items():
+            self.rules[column] = self._mapping_rule(column, mapping)
+
+    def _mapping_rule(self, kind, mapping):
+        def normalize(values):
+            mapped = values.map(mapping)
+            self._log_unmapped(kind, values[mapped.isna() & values.notna() & (values != 'nan')])
+            return mapped.fillna(values)
+        return normalize
+
+    def _course_rule(self, values):
+        standardized = normalize_course(values)
+        self._log_unmapped('course', values[(standardized == 'Other') & values.notna()])
+        return standardized
+
+    def _log_unmapped(self, kind, values):
+        if values.empty:
+            return
+        with self._lock:
+            self.unmapped.setdefault(kind, set()).update(str(value) for value in values)
+        for value in values:
+            logger.warning(f"No '{kind}' mapping for {value!r}")
+
+    def _lookup(self, kind, values):
+        results = [None] * len(values)
+        missing = []
+        with self._lock:
+            for i, value in enumerate(values):
+                key = (kind, value)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                else:
+                    missing.append(i)
+            self.hits += len(values) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return results
+
+        raw = pd.Series([np.nan if values[i] is _MISSING else values[i] for i in missing], dtype=object)
+        normalized = list(self.rules[kind](raw))
+        with self._lock:
+            for i, value in zip(missing, normalized):
+                results[i] = value
+                self._cache[(kind, values[i])] = value
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return results
+
+    def normalize(self, kind, value):
+        """Normalize a single raw value"""
+        return self._lookup(kind, [_MISSING if pd.isna(value) else value])[0]
+
+    def normalize_series(self, kind, series):
+        """Normalize each distinct value of a Series once and broadcast the results to every row"""
+        codes, uniques = pd.factorize(series)
+        # The missing key goes last so code -1 (missing) picks up its result
+        results = pd.Series(self._lookup(kind, list(uniques) + [_MISSING])).to_numpy()
+        return pd.Series(results.take(codes), index=series.index)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'unmapped': {kind: sorted(values) for kind, values in self.unmapped.items()},
+        }
+
+
+_normalizer = None
+_normalizer_lock = threading.Lock()
+
+def get_normalizer():
+    """Return the process-wide normalizer"""
+    global _normalizer
+    with _normalizer_lock:
+        if _normalizer is None:
+            _normalizer = Normalizer()
+        return _normalizer
@@ -1,9 +1,17 @@
 from io import BytesIO
+from collections import OrderedDict
+import hashlib
+import os
+import threading
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
-from models import GroqClient
+from charts import get_chart_renderer
+from dashboard import get_dashboard_cache
+from llm import get_llm_client
+from llm_cache import CachedLLM
+from normalization import get_normalizer
 from PIL import Image
 matplotlib.use('Agg')
 from pathlib import Path
@@ -11,14 +19,9 @@ from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 import base64
 
-def clean_numeric_values(value):
-    try:
-        if isinstance(value, str):
-            value = value.replace(',', '')
-        return float(value)
-    except (ValueError, TypeError):
-        return np.nan
-    
+# Decoded chart images kept for reuse across reports
+REPORT_IMAGE_CACHE_SIZE = int(os.environ.get("REPORT_IMAGE_CACHE_SIZE", "128"))
+
 def preprocess_dataframe(df):
     df = df.copy()
     
@@ -50,7 +53,7 @@ def preprocess_dataframe(df):
     ]
     
     for col in numeric_columns:
-        df[col] = df[col].apply(clean_numeric_values)
+        df[col] = get_normalizer().normalize_series('numeric', df[col])
     
     # Fill missing values in numeric columns
     df[numeric_columns] = df[numeric_columns].fillna(df[numeric_columns].median())
@@ -71,13 +74,59 @@ def preprocess_dataframe(df):
     
     return df
 
+class ChartImageCache:
+    """Chart images keyed by the SHA-256 of the PNG bytes or data URL they arrive as.
+
+    Charts rendered on the server are PNG bytes; charts sent by the browser
+    are base64 data URLs, hashed as they are and decoded only on a miss.
+    The same chart sent with several reports is decoded and measured once;
+    FPDF gets a fresh in-memory buffer of the cached bytes each time, so
+    nothing is written to disk. Least recently used images are dropped
+    beyond maxsize.
+    """
+
+    def __init__(self, maxsize=REPORT_IMAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_data):
+        """Return (buffer, width, height) for PNG bytes or a base64 data URL"""
+        is_png = isinstance(image_data, bytes)
+        key = hashlib.sha256(image_data if is_png else image_data.encode('ascii')).hexdigest()
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                content, width, height = self._images[key]
+                return BytesIO(content), width, height
+        content = image_data if is_png else base64.b64decode(image_data.split(",")[1])
+        with Image.open(BytesIO(content)) as image:
+            width, height = image.size
+        with self._lock:
+            self._images[key] = (content, width, height)
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+        return BytesIO(content), width, height
+
+
+_chart_image_cache = None
+_chart_image_cache_lock = threading.Lock()
+
+def get_chart_image_cache():
+    """Return the process-wide chart image cache"""
+    global _chart_image_cache
+    with _chart_image_cache_lock:
+        if _chart_image_cache is None:
+            _chart_image_cache = ChartImageCache()
+        return _chart_image_cache
+
+
 class Reports:
-    def __init__(self, df):
+    def __init__(self, df, llm=None):
         # print("df: " + str(df))
         self.df = preprocess_dataframe(df)
-        self.llm = GroqClient()
-        self.output_dir = Path("report_assets")
-        self.output_dir.mkdir(exist_ok=True)
+        # Any LLMClient; identical prompts are answered from the narrative cache
+        self.llm = llm if isinstance(llm, CachedLLM) else CachedLLM(llm or get_llm_client())
         self.pdf = FPDF()
         
         # Add Unicode font
@@ -130,17 +179,24 @@ class Reports:
                     stats[col] = self.df[col].value_counts().to_dict()
         return stats
 
+    def write_streamed_text(self, pieces):
+        """Lay out text line by line while it is still streaming in"""
+        pending = ''
+        for piece in pieces:
+            pending += piece
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                self.pdf.multi_cell(0, 10, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        if pending:
+            self.pdf.multi_cell(0, 10, pending, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
     def add_image_with_text(self, image_data, text):
         print(f"Adding image with text: {text}")
-        image_data_base64 = image_data.split(",")[1]  # Correctly split the image data
-        image = Image.open(BytesIO(base64.b64decode(image_data_base64)))
-        image_path = self.output_dir / f"{text}.png"
-        image.save(image_path)
+        image, width, height = get_chart_image_cache().get(image_data)
 
         # Calculate the appropriate width and height while maintaining aspect ratio
         max_width = 190
         max_height = 150
-        width, height = image.size
         aspect_ratio = width / height
 
         if height > max_height:
@@ -151,14 +207,19 @@ class Reports:
             width = max_width
             height = width / aspect_ratio
 
-        self.pdf.image(str(image_path), x=10, y=10, w=width, h=height)
+        self.pdf.image(image, x=10, y=10, w=width, h=height)
         self.pdf.set_xy(10, 10 + height + 10)  # Adjust the position for the text
         self.pdf.set_font('DejaVuLGCSans', '', 12)
         self.pdf.multi_cell(190, 9)
         print(f"Image with text added: {text}")
 
-    def generate_pdf_report(self, output_path, chart_images):
+    def generate_pdf_report(self, output_path, chart_images, progress=None):
+        def report_progress(fraction, stage):
+            if progress is not None:
+                progress(fraction, stage)
+
         # Initialize PDF
+        report_progress(0.05, "statistics")
         self.pdf.add_page()
         self.pdf.set_font('DejaVuLGCSans-Bold', '', 16)
 
@@ -261,26 +322,56 @@ class Reports:
         • Encouraging balanced lifestyles, reduced social media reliance, and physical activity can promote resilience.
         """
 
-        # Generate report content
-        report_content = self.llm.generate_report(prompt)
-
         # Add content to PDF
         self.pdf.cell(200, 10, "Student Mental Health Analysis", 
                     new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         self.pdf.set_font('DejaVuLGCSans', '', 12)
-        self.pdf.multi_cell(0, 10, report_content)
+
+        # Generate report content, laying it out as it arrives. A failed
+        # completion raises LLMError and fails the report instead of ending
+        # up in the PDF
+        report_progress(0.1, "narrative")
+        self.write_streamed_text(self.llm.stream(prompt))
 
         # Debug: Print the number of charts to be processed
         print(f"Number of charts to be processed: {len(chart_images)}")
 
         # Add provided chart images with text
-        for title, image in chart_images.items():
-            if isinstance(image, str) and image.startswith("data:image/png;base64,"):
+        report_progress(0.6, "charts")
+        for number, (title, image) in enumerate(chart_images.items(), start=1):
+            if isinstance(image, bytes) or (isinstance(image, str) and image.startswith("data:image/png;base64,")):
                 # Generate a meaningful title or use a default title
                 chart_title = title if title != "[object HTMLDivElement]" else "Chart"
                 print(f"Adding chart image for: {chart_title}")
                 self.pdf.add_page()
                 self.add_image_with_text(image, f"Analysis for {chart_title.replace('_', ' ').title()}")
+            report_progress(0.6 + 0.35 * number / len(chart_images), "charts")
+
+        # Write under a temporary name so a finished-looking file is always complete
+        report_progress(0.95, "saving")
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        self.pdf.output(tmp_path)
+        os.replace(tmp_path, output_path)
+        print(f"PDF report generated at: {output_path}")
+
+
+def build_report(df, chart_images, output_path, progress=None):
+    """Build a PDF report for the dashboard rows in df; run as a background job"""
+    Reports(df).generate_pdf_report(output_path, chart_images, progress=progress)
+    return output_path
+
+
+def build_dashboard_report(output_path, university=None, year=None, filters=None, courses=None, progress=None):
+    """Build a PDF report for the dashboard rows matching the filters, with charts rendered on the server.
 
-        self.pdf.output(output_path)
-        print(f"PDF report generated at: {output_path}")
\ No newline at end of file
+    The charts start rendering in the chart pool before the narrative is
+    requested, so the two overlap.
+    """
+    chart_images = get_chart_renderer().submit(university, year, filters, courses)
+    cache = get_dashboard_cache()
+    df = cache.frame(university)
+    selected = cache.selection(university, year, filters, courses)
+    if selected is not None:
+        df = df.iloc[selected]
+    return build_report(df.drop(columns=['source']), chart_images, output_path, progress)
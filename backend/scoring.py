@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+
+PENDING_ACTUAL = "Prefer not to say / I don't know"
+SCORING_STATE_PATH = "../data/merged/scoring_state.json"
+SCORING_MODE = os.environ.get("SCORING_MODE", "incremental").lower()
+
+
+class ScoringPipeline:
+    """Frozen preprocessing and model used to score responses.
+
+    Every step uses statistics captured when the pipeline was fitted, so a
+    row's prediction depends only on that row's answers.
+    """
+
+    def __init__(self, model, numeric_features, encoder, imputer, scaler, version=None):
+        self.model = model
+        self.numeric_features = list(numeric_features)
+        self.encoder = encoder
+        self.imputer = imputer
+        self.scaler = scaler
+        self.version = version or uuid.uuid4().hex
+
+    @property
+    def categorical_features(self):
+        return self.encoder.columns
+
+    @property
+    def features(self):
+        return self.numeric_features + self.categorical_features
+
+    def encode(self, df):
+        """Coerce numeric answers and encode categorical ones, before imputing and scaling"""
+        X = df[self.numeric_features].apply(pd.to_numeric, errors='coerce')
+        X = pd.concat([X, self.encoder.transform(df)], axis=1)
+        return X[self.features]
+
+    def transform(self, df):
+        X = self.imputer.transform(self.encode(df))
+        n_numeric = len(self.numeric_features)
+        X[:, :n_numeric] = self.scaler.transform(pd.DataFrame(X[:, :n_numeric], columns=self.numeric_features))
+        return X
+
+    def predict(self, df):
+        if len(df) == 0:
+            return np.array([], dtype=int)
+        return self.model.predict(self.transform(df))
+
+
+class IncrementalScorer:
+    """Score only responses whose answers have not been scored before.
+
+    Predictions are remembered per row hash of the model features together
+    with the pipeline version, so new or edited rows are the only ones sent
+    through the pipeline. Full mode scores every pending row and gives the
+    same result. Only the hashes of rows still pending are kept.
+    """
+
+    def __init__(self, pipeline, state_path=SCORING_STATE_PATH):
+        self.pipeline = pipeline
+        self.state_path = state_path
+        self.cache = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('pipeline_version') == self.pipeline.version:
+                    return state.get('predictions', {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable scoring state: {e}")
+        return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # A temporary file of its own, so scoring runs in other processes never write over it
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pipeline_version': self.pipeline.version, 'predictions': self.cache}, f)
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def row_hashes(self, df):
+        keys = pd.DataFrame(index=df.index)
+        for col in self.pipeline.numeric_features:
+            keys[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        for col in self.pipeline.categorical_features:
+            keys[col] = df[col].astype(str)
+        return pd.util.hash_pandas_object(keys, index=False).astype(str)
+
+    def score(self, df, full=False):
+        """Return predictions that differ from the stored ones, indexed like df"""
+        with self._lock:
+            return self._score(df, full)
+
+    def _score(self, df, full):
+        pending = df[df['actual'] == PENDING_ACTUAL]
+        hashes = self.row_hashes(pending) if not pending.empty else pd.Series(dtype=str)
+        # Forget rows that were removed or are no longer pending
+        live = set(hashes)
+        pruned = {h: p for h, p in self.cache.items() if h in live}
+        changed = len(pruned) != len(self.cache)
+        self.cache = pruned
+        if pending.empty:
+            if changed:
+                self._save_state()
+            return pd.Series(dtype=int)
+
+        if full:
+            to_score = pending
+        else:
+            to_score = pending[~hashes.isin(self.cache.keys())]
+
+        if len(to_score):
+            predictions = self.pipeline.predict(to_score)
+            self.cache.update({h: int(p) for h, p in zip(hashes[to_score.index], predictions)})
+            changed = True
+        if changed:
+            self._save_state()
+        print(f"Scored {len(to_score)} of {len(pending)} pending rows ({'full' if full else 'incremental'})")
+
+        scored = hashes.map(self.cache).astype(int)
+        stored = pd.to_numeric(pending['predictions'], errors='coerce')
+        return scored[scored != stored]
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer(pipeline):
+    """Return a scorer for the pipeline, reusing its in-memory cache between runs"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None or _scorer.pipeline is not pipeline:
+            _scorer = IncrementalScorer(pipeline)
+        return _scorer
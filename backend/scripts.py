@@ -1,5 +1,11 @@
 import pandas as pd
 import os
+import shutil
+import tempfile
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 def update_predictions(file_path=r"C:\Projects\mentalhealth\data\merged\merged_data.xlsx"):
     """Update the prediction column based on the actual column"""
@@ -19,5 +25,154 @@ def update_predictions(file_path=r"C:\Projects\mentalhealth\data\merged\merged_d
     except Exception as e:
         print(f"Error processing file: {e}")
 
+def _open_storage(backend, directory):
+    from storage import ExcelStorage, SQLiteStorage
+    if backend == 'excel':
+        return ExcelStorage(os.path.join(directory, 'stress_data.xlsx'))
+    return SQLiteStorage(os.path.join(directory, 'stress_data.db'))
+
+
+def _stress_worker(backend, directory, worker, threads, rows, rewrite_every):
+    """Append rows from several threads of one process, rewriting predictions as the scoring job does"""
+    storage = _open_storage(backend, directory)
+    errors = []
+    started = time.time()
+
+    def submit(thread):
+        try:
+            for i in range(rows):
+                storage.append_row({'source': f'W{worker}', 'diet': f'{worker}-{thread}-{i}', 'predictions': 0})
+                if thread == 0 and rewrite_every and i % rewrite_every == rewrite_every - 1:
+                    df = storage.read_frame()
+                    storage.update_predictions({label: 1 for label in df.index[:5]})
+        except Exception as e:
+            errors.append(f"worker {worker} thread {thread}: {e!r}")
+
+    pool = [threading.Thread(target=submit, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return errors, started, time.time()
+
+
+def stress_test_storage(backend='sqlite', processes=4, threads=8, rows=25, rewrite_every=10):
+    """Submit rows concurrently from several processes and threads; check none were lost or duplicated"""
+    directory = tempfile.mkdtemp(prefix='storage_stress_')
+    try:
+        # Create the store before the workers race to do it
+        _open_storage(backend, directory)
+        errors, spans = [], []
+        # Spawned, not forked, so workers do not inherit this process's open connections
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [
+                executor.submit(_stress_worker, backend, directory, worker, threads, rows, rewrite_every)
+                for worker in range(processes)
+            ]
+            for future in futures:
+                worker_errors, started, finished = future.result()
+                errors += worker_errors
+                spans.append((started, finished))
+        # From the first worker starting to submit to the last one finishing, without interpreter start-up
+        elapsed = max(finished for _, finished in spans) - min(started for started, _ in spans)
+
+        stored = _open_storage(backend, directory).read_frame()['diet'].astype(str)
+        expected = {f'{worker}-{thread}-{i}' for worker in range(processes) for thread in range(threads) for i in range(rows)}
+        missing = expected - set(stored)
+        duplicated = stored[stored.duplicated()].tolist()
+        print(f"{backend}: {len(expected)} submissions from {processes} processes x {threads} threads "
+              f"in {elapsed:.2f}s ({len(expected) / elapsed:.0f} rows/s)")
+        print(f"Stored {len(stored)} rows, {len(missing)} missing, {len(duplicated)} duplicated")
+        for error in errors:
+            print(f"Error in {error}")
+        return not missing and not duplicated and not errors
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def load_test_reports(reports=20, threads=4, delay=2.0, failure_rate=0.0, sample=200):
+    """Build PDF reports concurrently against the fake LLM backend, without network access"""
+    from llm import FakeLLM
+    from llm_cache import CachedLLM, NarrativeCache
+    from dashboard import get_dashboard_cache
+    from reports import Reports
+
+    # The rows the dashboard sends with a report request
+    df = get_dashboard_cache().frame().drop(columns=['source'])
+    directory = tempfile.mkdtemp(prefix='report_load_')
+    # One client and cache shared by every report, as in the API; a fresh cache so every prompt is a miss
+    llm = CachedLLM(FakeLLM(delay=delay, failure_rate=failure_rate), NarrativeCache(os.path.join(directory, 'cache')))
+    errors = []
+
+    def build(number):
+        # A different sample per report gives different statistics, so each prompt reaches the LLM
+        rows = df.sample(n=min(sample, len(df)), random_state=number)
+        output_path = os.path.join(directory, f'report_{number}.pdf')
+        try:
+            Reports(rows, llm=llm).generate_pdf_report(output_path, {})
+        except Exception as e:
+            errors.append(f"report {number}: {e!r}")
+            if os.path.exists(output_path):
+                errors.append(f"report {number}: failed but left a PDF behind")
+
+    try:
+        started = time.perf_counter()
+        pending = list(range(reports))
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    number = pending.pop()
+                build(number)
+
+        pool = [threading.Thread(target=work) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        built = len([name for name in os.listdir(directory) if name.endswith('.pdf')])
+        print(f"Built {built} of {reports} reports with {threads} threads in {elapsed:.2f}s "
+              f"({built / elapsed:.2f} reports/s, {delay:.1f}s per completion)")
+        for error in errors:
+            print(f"Error in {error}")
+        return built == reports
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
 if __name__ == "__main__":
-    update_predictions()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintenance scripts for the response data")
+    subparsers = parser.add_subparsers(dest="command")
+    predictions_parser = subparsers.add_parser("predictions", help="set predictions from the diagnosis answer in a spreadsheet")
+    predictions_parser.add_argument("file_path", nargs="?")
+    stress_parser = subparsers.add_parser("stress", help="check that concurrent submissions are never lost")
+    stress_parser.add_argument("--backend", choices=["sqlite", "excel"], default="sqlite")
+    stress_parser.add_argument("--processes", type=int, default=4)
+    stress_parser.add_argument("--threads", type=int, default=8)
+    stress_parser.add_argument("--rows", type=int, default=25, help="rows submitted by each thread")
+    stress_parser.add_argument("--rewrite-every", type=int, default=10, help="rows between prediction rewrites (0 to disable)")
+    reports_parser = subparsers.add_parser("reports", help="load-test report generation against the fake LLM backend")
+    reports_parser.add_argument("--reports", type=int, default=20)
+    reports_parser.add_argument("--threads", type=int, default=4)
+    reports_parser.add_argument("--delay", type=float, default=2.0, help="seconds the fake LLM takes per completion")
+    reports_parser.add_argument("--failure-rate", type=float, default=0.0, help="share of fake LLM attempts that fail")
+    reports_parser.add_argument("--sample", type=int, default=200, help="responses per report")
+    args = parser.parse_args()
+
+    if args.command == "reports":
+        ok = load_test_reports(args.reports, args.threads, args.delay, args.failure_rate, args.sample)
+        raise SystemExit(0 if ok else 1)
+    elif args.command == "stress":
+        ok = stress_test_storage(args.backend, args.processes, args.threads, args.rows, args.rewrite_every)
+        raise SystemExit(0 if ok else 1)
+    elif args.command == "predictions" and args.file_path:
+        update_predictions(args.file_path)
+    else:
+        update_predictions()
\ No newline at end of file
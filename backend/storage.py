@@ -0,0 +1,495 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+import numpy as np
+import pandas as pd
+from models import GoogleFormsTranslationMap, QuestionNumberToField
+
+# Column IDs in the order used by the merged spreadsheet (second header row)
+METADATA_COLUMNS = ['source', 'predictions', 'captured_at']
+COLUMN_IDS = [QuestionNumberToField[number] for number in sorted(QuestionNumberToField)] + METADATA_COLUMNS
+COLUMN_POSITIONS = {col_id: position for position, col_id in enumerate(COLUMN_IDS)}
+
+# Default question headers (first header row) used when exporting to Excel
+_FIELD_TO_QUESTION = {field: question for question, field in GoogleFormsTranslationMap.items()}
+DEFAULT_QUESTION_HEADERS = {
+    **{col_id: _FIELD_TO_QUESTION.get(col_id, col_id) for col_id in COLUMN_IDS},
+    'source': 'Source',
+    'predictions': 'Predictions',
+    'captured_at': 'Captured At',
+}
+
+MERGED_EXCEL_PATH = "../data/merged/merged_data.xlsx"
+MERGED_DB_PATH = "../data/merged/merged_data.db"
+# Per-university copies of the responses, written after each scoring run
+SOURCE_EXCEL_PATH = "../data/{name}/{name}_data/{name}_data.xlsx"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite").lower()
+# Seconds a SQLite connection waits for another process's write before giving up
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "30"))
+# Size the Excel backend's write-ahead log may reach before it is folded into the workbook
+EXCEL_WAL_MAX_BYTES = int(os.environ.get("EXCEL_WAL_MAX_BYTES", str(1024 * 1024)))
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive OS-level lock on path + '.lock', shared by every process writing the same file"""
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    with open(lock_path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def source_excel_path(source):
+    name = str(source).strip().lower()
+    return SOURCE_EXCEL_PATH.format(name=name)
+
+
+def read_two_header_excel(excel_path):
+    """Read the legacy layout (questions row, column IDs row, data) into a frame keyed by column IDs"""
+    df = pd.read_excel(excel_path, header=None)
+    questions_row = df.iloc[0].copy()
+    column_ids = df.iloc[1].copy()
+    df = df.iloc[2:].copy()
+    df.columns = column_ids
+    questions = {col_id: question for col_id, question in zip(column_ids, questions_row) if pd.notna(col_id)}
+    return df, questions
+
+
+def write_two_header_excel(df, excel_path, questions=None):
+    """Write a frame keyed by column IDs using the legacy two-header-row layout"""
+    questions = {**DEFAULT_QUESTION_HEADERS, **(questions or {})}
+    header = [questions.get(col_id, col_id) for col_id in df.columns]
+    out = pd.DataFrame([list(df.columns)] + df.values.tolist(), columns=header)
+    directory = os.path.dirname(excel_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Write a temporary file next to the target and rename it over the target,
+    # so readers see either the old workbook or the new one, never a partial one
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp.xlsx', dir=directory)
+    os.close(fd)
+    try:
+        out.to_excel(tmp_path, index=False)
+        os.replace(tmp_path, excel_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class GroupCommit:
+    """Batches appends made concurrently into one durable write.
+
+    Callers queue their rows and then take the writer lock; whichever caller
+    gets it first writes every queued batch in one transaction (one fsync),
+    and the others find theirs already written once they get the lock.
+    """
+
+    def __init__(self, locked, write):
+        self._locked = locked
+        self._write = write
+        self._queue = []
+        self._queue_lock = threading.Lock()
+
+    def submit(self, rows):
+        batch = {'rows': rows, 'done': False, 'error': None}
+        with self._queue_lock:
+            self._queue.append(batch)
+        with self._locked():
+            if not batch['done']:
+                with self._queue_lock:
+                    batches, self._queue = self._queue, []
+                try:
+                    self._write([row for queued in batches for row in queued['rows']])
+                except Exception as e:
+                    for queued in batches:
+                        queued['error'] = e
+                for queued in batches:
+                    queued['done'] = True
+        if batch['error'] is not None:
+            raise batch['error']
+
+
+def _to_sql_value(value):
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(item) for item in value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%d.%m.%Y %H:%M')
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    return value
+
+
+def _to_json_value(value):
+    value = _to_sql_value(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class StorageBackend(ABC):
+    """Interface shared by the questionnaire response stores"""
+
+    # Bumped by every write made through this process
+    version = 0
+
+    def __init__(self):
+        # Sources whose rows changed since their spreadsheets were last written.
+        # None until the first export, which writes every source, so changes
+        # made before this process started are never left out
+        self._dirty_sources = None
+        self._dirty_lock = threading.Lock()
+
+    def mark_dirty(self, sources):
+        """Record sources with new or changed rows"""
+        with self._dirty_lock:
+            if self._dirty_sources is not None:
+                self._dirty_sources.update(
+                    source for source in sources if pd.notna(source) and str(source).strip()
+                )
+
+    def changed(self):
+        """Record a write so cached views of the responses are rebuilt"""
+        self.version += 1
+
+    def data_files(self):
+        """Files holding the responses, watched for writes made by other processes"""
+        return []
+
+    def change_token(self):
+        """Value that differs whenever the stored responses may have changed"""
+        stamps = []
+        for path in self.data_files():
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return self.version, tuple(stamps)
+
+    def append_row(self, row):
+        """Append a single response keyed by column ID"""
+        return self.append_rows([row])
+
+    @abstractmethod
+    def append_rows(self, rows):
+        """Append responses keyed by column ID in one write"""
+
+    @abstractmethod
+    def read_frame(self, source=None):
+        """Return all responses keyed by column ID, optionally restricted to one source"""
+
+    def iter_frames(self, source=None, chunksize=5000):
+        """Yield the responses of read_frame in frames of at most chunksize rows"""
+        df = self.read_frame(source=source)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    @abstractmethod
+    def update_predictions(self, predictions):
+        """Write back predictions given as a mapping of row index to value"""
+
+    def export_excel(self, excel_path, source=None):
+        """Export responses to the legacy two-header-row Excel layout"""
+        df = self.read_frame(source=source)
+        write_two_header_excel(df, excel_path, self.question_headers())
+
+    def export_changed_sources(self):
+        """Rewrite the per-university spreadsheets of sources whose rows changed; return those sources"""
+        with self._dirty_lock:
+            dirty, self._dirty_sources = self._dirty_sources, set()
+        try:
+            if dirty is None:
+                df = self.read_frame()
+                frames = {source: rows for source, rows in df.groupby('source') if str(source).strip()}
+            else:
+                frames = {source: self.read_frame(source=source) for source in dirty}
+            questions = self.question_headers()
+            for source, rows in frames.items():
+                write_two_header_excel(rows, source_excel_path(source), questions)
+        except Exception:
+            # Keep the sources dirty so the next export retries them
+            with self._dirty_lock:
+                if dirty is None or self._dirty_sources is None:
+                    self._dirty_sources = None
+                else:
+                    self._dirty_sources |= dirty
+            raise
+        return sorted(frames)
+
+    def question_headers(self):
+        return dict(DEFAULT_QUESTION_HEADERS)
+
+
+class ExcelStorage(StorageBackend):
+    """Legacy store that keeps every response in a single spreadsheet.
+
+    Appends go to a JSON-lines write-ahead log next to the workbook, so a
+    submission never has to parse or rewrite the spreadsheet. The log is
+    folded into the workbook on the next full write, or by compact() once
+    it grows past wal_max_bytes.
+
+    Every access holds a thread lock and an OS file lock on the workbook, so
+    API workers, scoring jobs and scripts in other processes never fold the
+    log while another process is appending to it.
+    """
+
+    def __init__(self, excel_path=MERGED_EXCEL_PATH, wal_max_bytes=EXCEL_WAL_MAX_BYTES):
+        self.excel_path = excel_path
+        self.wal_path = os.path.splitext(excel_path)[0] + '.wal.jsonl'
+        self.wal_max_bytes = wal_max_bytes
+        super().__init__()
+        self._lock = threading.Lock()
+        self._appends = GroupCommit(self._locked, self._append_wal)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, file_lock(self.excel_path):
+            yield
+
+    def append_rows(self, rows):
+        lines = ''.join(
+            json.dumps([_to_json_value(row.get(col_id)) for col_id in COLUMN_IDS], ensure_ascii=False) + '\n'
+            for row in rows
+        )
+        self._appends.submit([lines])
+        self.mark_dirty(row.get('source') for row in rows)
+
+    def _append_wal(self, chunks):
+        os.makedirs(os.path.dirname(self.wal_path) or '.', exist_ok=True)
+        with open(self.wal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+            wal_bytes = f.tell()
+        self.changed()
+        # Still under the lock, so no other writer can append while the log is folded in
+        if wal_bytes > self.wal_max_bytes:
+            self._compact()
+
+    def _read_wal(self):
+        if not os.path.exists(self.wal_path):
+            return pd.DataFrame(columns=COLUMN_IDS)
+        with open(self.wal_path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        # Newest responses go directly below the header rows
+        return pd.DataFrame(rows[::-1], columns=COLUMN_IDS)
+
+    def _read_all(self):
+        if os.path.exists(self.excel_path):
+            df, questions = read_two_header_excel(self.excel_path)
+        else:
+            df, questions = pd.DataFrame(columns=COLUMN_IDS), {}
+        pending = self._read_wal()
+        if len(pending):
+            df = pd.concat([pending.reindex(columns=df.columns), df], ignore_index=True)
+        # Label rows counting from the oldest one so labels survive new appends
+        df.index = range(len(df) - 1, -1, -1)
+        return df, questions
+
+    def compact(self):
+        """Fold the write-ahead log into the workbook"""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        df, questions = self._read_all()
+        self._write(df, questions)
+
+    def _write(self, df, questions):
+        write_two_header_excel(df, self.excel_path, questions)
+        if os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self.changed()
+
+    def data_files(self):
+        return [self.excel_path, self.wal_path]
+
+    def read_frame(self, source=None):
+        with self._locked():
+            df, _ = self._read_all()
+        if source is not None:
+            df = df[df['source'] == source]
+        return df
+
+    def update_predictions(self, predictions):
+        if not len(predictions):
+            return
+        with self._locked():
+            df, questions = self._read_all()
+            for index, value in dict(predictions).items():
+                df.loc[index, 'predictions'] = value
+            self._write(df, questions)
+            self.mark_dirty(df.loc[list(dict(predictions)), 'source'].unique())
+
+    def question_headers(self):
+        if not os.path.exists(self.excel_path):
+            return dict(DEFAULT_QUESTION_HEADERS)
+        _, questions = read_two_header_excel(self.excel_path)
+        return {**DEFAULT_QUESTION_HEADERS, **questions}
+
+
+class SQLiteStorage(StorageBackend):
+    """Append-only SQLite table with one column per questionnaire column ID"""
+
+    INSERT_SQL = "INSERT INTO responses ({}) VALUES ({})".format(
+        ', '.join(f'"{col_id}"' for col_id in COLUMN_IDS),
+        ', '.join('?' for _ in COLUMN_IDS)
+    )
+
+    def __init__(self, db_path=MERGED_DB_PATH):
+        self.db_path = db_path
+        super().__init__()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        columns = ', '.join(f'"{col_id}"' for col_id in COLUMN_IDS)
+        # One long-lived writer connection; readers open their own and are not
+        # blocked by appends in WAL mode. Appends from concurrent requests are
+        # group-committed, and other processes wait up to SQLITE_BUSY_TIMEOUT
+        self._writer = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._writer:
+            self._writer.execute(f"CREATE TABLE IF NOT EXISTS responses (row_id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+            self._writer.execute("CREATE INDEX IF NOT EXISTS responses_source ON responses (source)")
+            self._writer.execute("CREATE TABLE IF NOT EXISTS headers (column_id TEXT PRIMARY KEY, question TEXT)")
+        self._appends = GroupCommit(lambda: self._lock, self._insert)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT)
+
+    def data_files(self):
+        return [self.db_path, f"{self.db_path}-wal"]
+
+    def is_empty(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM responses LIMIT 1").fetchone() is None
+
+    def append_rows(self, rows):
+        values = [[_to_sql_value(row.get(col_id)) for col_id in COLUMN_IDS] for row in rows]
+        self._appends.submit(values)
+        self.changed()
+        self.mark_dirty(row.get('source') for row in rows)
+
+    def _insert(self, values):
+        with self._writer:
+            self._writer.executemany(self.INSERT_SQL, values)
+
+    def read_frame(self, source=None):
+        query = "SELECT * FROM responses"
+        params = ()
+        if source is not None:
+            query += " WHERE source = ?"
+            params = (source,)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(query + " ORDER BY row_id", conn, params=params, index_col='row_id')
+        return df
+
+    def iter_frames(self, source=None, chunksize=5000):
+        # Rows are fetched from the cursor chunk by chunk, never all at once
+        query = "SELECT * FROM responses"
+        params = ()
+        if source is not None:
+            query += " WHERE source = ?"
+            params = (source,)
+        with closing(self._connect()) as conn:
+            yield from pd.read_sql_query(
+                query + " ORDER BY row_id", conn, params=params, index_col='row_id', chunksize=chunksize
+            )
+
+    def update_predictions(self, predictions):
+        values = [(_to_sql_value(value), int(row_id)) for row_id, value in dict(predictions).items()]
+        if not values:
+            return
+        with self._lock, self._writer:
+            self._writer.executemany("UPDATE responses SET predictions = ? WHERE row_id = ?", values)
+            sources = self._writer.execute(
+                "SELECT DISTINCT source FROM responses WHERE row_id IN (SELECT value FROM json_each(?))",
+                (json.dumps([row_id for _, row_id in values]),)
+            ).fetchall()
+        self.changed()
+        self.mark_dirty(source for source, in sources)
+
+    def question_headers(self):
+        with closing(self._connect()) as conn:
+            stored = dict(conn.execute("SELECT column_id, question FROM headers").fetchall())
+        return {**DEFAULT_QUESTION_HEADERS, **stored}
+
+    def import_excel(self, excel_path):
+        """Import responses from a spreadsheet in the two-header-row layout"""
+        df, questions = read_two_header_excel(excel_path)
+        df = df.reindex(columns=COLUMN_IDS)
+        # Insert oldest first so row_id follows submission order. The spreadsheet lists the
+        # newest first; rows without a parseable captured_at keep that order, reversed
+        df = df.iloc[::-1]
+        captured_at = pd.to_datetime(df['captured_at'], format='%d.%m.%Y %H:%M', errors='coerce')
+        df = df.loc[captured_at.sort_values(kind='stable', na_position='first').index]
+        self.append_rows(df.to_dict('records'))
+        with self._lock, self._writer:
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO headers (column_id, question) VALUES (?, ?)",
+                [(str(col_id), str(question)) for col_id, question in questions.items() if col_id in COLUMN_IDS]
+            )
+        print(f"Imported {len(df)} rows from {excel_path}")
+        return len(df)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """Return the process-wide storage backend selected by STORAGE_BACKEND"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == 'excel':
+                _storage = ExcelStorage(MERGED_EXCEL_PATH)
+            elif STORAGE_BACKEND == 'sqlite':
+                _storage = SQLiteStorage(MERGED_DB_PATH)
+                # First start after the migration: seed the table from the spreadsheet
+                if _storage.is_empty() and os.path.exists(MERGED_EXCEL_PATH):
+                    _storage.import_excel(MERGED_EXCEL_PATH)
+            else:
+                raise ValueError(f"Unsupported storage backend: {STORAGE_BACKEND}")
+        return _storage
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import or export questionnaire responses")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import a two-header-row Excel file into SQLite")
+    import_parser.add_argument("excel_path", nargs="?", default=MERGED_EXCEL_PATH)
+    import_parser.add_argument("--db", default=MERGED_DB_PATH)
+    export_parser = subparsers.add_parser("export", help="Export responses to a two-header-row Excel file")
+    export_parser.add_argument("excel_path")
+    export_parser.add_argument("--source", default=None)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        SQLiteStorage(args.db).import_excel(args.excel_path)
+    else:
+        get_storage().export_excel(args.excel_path, source=args.source)
+        print(f"Exported responses to {args.excel_path}")
@@ -0,0 +1,130 @@
+import os
+import time
+import pytest
+import llm_cache
+from llm_cache import CachedLLM, NarrativeCache
+
+
+class StubLLM:
+    """LLM client that streams the prompt back word by word and counts its calls"""
+
+    def __init__(self, model='stub-model', temperature=0.2, fail_after=None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = 512
+        self.system_prompt = "You are a stub."
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.calls += 1
+        for count, word in enumerate(prompt.split()):
+            if self.fail_after is not None and count == self.fail_after:
+                raise RuntimeError("stream broke off")
+            yield word + ' '
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NarrativeCache(directory=str(tmp_path), ttl=60, max_bytes=10 * 1024 * 1024)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, 'time', clock)
+    return clock
+
+
+def test_same_prompt_is_served_from_cache(cache):
+    client = StubLLM()
+    llm = CachedLLM(client, cache)
+    first = llm.complete("students report stress before exams")
+    second = llm.complete("students report stress before exams")
+    assert first == second == "students report stress before exams "
+    assert client.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_different_prompt_misses(cache):
+    client = StubLLM()
+    llm = CachedLLM(client, cache)
+    llm.complete("first prompt")
+    assert llm.complete("second prompt") == "second prompt "
+    assert client.calls == 2
+    assert cache.stats()['entries'] == 2
+
+
+@pytest.mark.parametrize('setting, value', [('model', 'other-model'), ('temperature', 0.9)])
+def test_changed_completion_setting_misses(cache, setting, value):
+    client = StubLLM()
+    CachedLLM(client, cache).complete("same prompt")
+    setattr(client, setting, value)
+    CachedLLM(client, cache).complete("same prompt")
+    assert client.calls == 2
+    assert cache.hits == 0
+
+
+def test_entry_expires_after_ttl(cache, clock):
+    client = StubLLM()
+    llm = CachedLLM(client, cache)
+    llm.complete("expiring prompt")
+    clock.now += cache.ttl - 1
+    llm.complete("expiring prompt")
+    assert client.calls == 1
+    clock.now += 2
+    assert llm.complete("expiring prompt") == "expiring prompt "
+    assert client.calls == 2
+
+
+def test_expired_entry_is_removed(cache, clock):
+    cache.put('key', "text")
+    clock.now += cache.ttl + 1
+    assert cache.get('key') is None
+    assert not os.path.exists(cache._path('key'))
+
+
+def test_least_recently_used_evicted_past_max_bytes(cache):
+    cache.put('a', "x" * 100)
+    entry_size = os.path.getsize(cache._path('a'))
+    # Room for two entries; the slack covers created_at serializing a few characters longer
+    cache.max_bytes = 2 * entry_size + 16
+    cache.put('b', "y" * 100)
+    # Make the mtime order explicit rather than relying on the filesystem's resolution
+    now = time.time()
+    os.utime(cache._path('a'), (now - 20, now - 20))
+    os.utime(cache._path('b'), (now - 10, now - 10))
+    # A hit refreshes a, which leaves b the least recently used
+    assert cache.get('a') == "x" * 100
+    cache.put('c', "z" * 100)
+    assert cache.get('b') is None
+    assert cache.get('a') == "x" * 100
+    assert cache.get('c') == "z" * 100
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_failed_completion_is_not_cached(cache):
+    client = StubLLM(fail_after=2)
+    llm = CachedLLM(client, cache)
+    with pytest.raises(RuntimeError):
+        llm.complete("one two three four")
+    assert cache.stats()['entries'] == 0
+    client.fail_after = None
+    assert llm.complete("one two three four") == "one two three four "
+    assert client.calls == 2
+
+
+def test_abandoned_stream_is_not_cached(cache):
+    client = StubLLM()
+    stream = CachedLLM(client, cache).stream("one two three")
+    assert next(stream) == "one "
+    stream.close()
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,44 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from scripts import _open_storage, _stress_worker
+
+THREADS = 4
+ROWS = 10
+# Thread 0 of each worker rewrites predictions this often, as the scoring job does
+REWRITE_EVERY = 5
+
+
+def assert_every_row_stored_once(backend, directory, workers):
+    df = _open_storage(backend, directory).read_frame()
+    stored = df['diet'].astype(str)
+    expected = {f'{worker}-{thread}-{i}' for worker in range(workers) for thread in range(THREADS) for i in range(ROWS)}
+    assert len(df) == len(expected)
+    assert set(stored) == expected
+    assert not stored.duplicated().any()
+    assert df.index.is_unique
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'excel'])
+def test_concurrent_threads_lose_no_rows(backend, tmp_path):
+    directory = str(tmp_path)
+    _open_storage(backend, directory)
+    errors, _, _ = _stress_worker(backend, directory, 0, THREADS, ROWS, REWRITE_EVERY)
+    assert errors == []
+    assert_every_row_stored_once(backend, directory, workers=1)
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'excel'])
+def test_concurrent_processes_lose_no_rows(backend, tmp_path):
+    directory = str(tmp_path)
+    workers = 3
+    # Create the store before the workers race to do it
+    _open_storage(backend, directory)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [
+            executor.submit(_stress_worker, backend, directory, worker, THREADS, ROWS, REWRITE_EVERY)
+            for worker in range(workers)
+        ]
+        errors = [error for future in futures for error in future.result()[0]]
+    assert errors == []
+    assert_every_row_stored_once(backend, directory, workers)
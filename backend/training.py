@@ -0,0 +1,172 @@
+import json
+import os
+import warnings
+from datetime import datetime
+import joblib
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from sklearn.base import clone
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score
+from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.preprocessing import StandardScaler
+from data_evaluation import CORRECT_COLUMNS, SELECTED_CATEGORICAL_FEATURES, SELECTED_NUMERIC_FEATURES, build_search
+from encoding import CategoricalEncoder
+from model_registry import ACTIVE_MODEL, BUNDLE_DIR, MODEL_NAMES, get_registry
+from scoring import ScoringPipeline
+from storage import get_storage
+
+
+def check_trainable(model_name, search=False):
+    """Raise ValueError unless model_name can be trained, before any data is read"""
+    if model_name not in MODEL_NAMES:
+        raise ValueError(f"Unknown model: {model_name}; use one of {MODEL_NAMES}")
+    available = get_registry().available_models()
+    if not search and model_name not in available:
+        raise ValueError(
+            f"No serialized {model_name} model to take hyperparameters from "
+            f"(available: {available}); train it with search enabled"
+        )
+
+
+def fit_pipeline(df, model_name=ACTIVE_MODEL, search=False):
+    """Fit preprocessing and a model on the merged dataset; return (pipeline, metrics)"""
+    check_trainable(model_name, search)
+    model_type, sampling = model_name.rsplit('_', 1)
+    missing = [col for col in CORRECT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Training data is missing the columns: {missing}")
+    # By name, so a store with its columns in another order or with extra ones is read the same way
+    df = df[CORRECT_COLUMNS].copy()
+
+    # Fit vocabularies once on every response so training and scoring share codes
+    pipeline = ScoringPipeline(
+        model=None,
+        numeric_features=SELECTED_NUMERIC_FEATURES,
+        encoder=CategoricalEncoder(SELECTED_CATEGORICAL_FEATURES).fit(df),
+        imputer=None,
+        scaler=None
+    )
+
+    # Keep only Yes/No responses for training
+    labelled = df[df['actual'].isin(['Yes', 'No', 1, 0])]
+    y = labelled['actual'].map({'Yes': 1, 'No': 0, 1: 1, 0: 0}).astype(int).values
+    if len(labelled) == 0:
+        raise ValueError("No valid data available for training")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        pipeline.encode(labelled), y, test_size=0.25, random_state=42, stratify=y
+    )
+    # Imputer and scaler see the training split only, so the held-out score is not inflated
+    pipeline.imputer = SimpleImputer(strategy='mean').fit(X_train)
+    X_train = pd.DataFrame(pipeline.imputer.transform(X_train), columns=pipeline.features)
+    X_test = pd.DataFrame(pipeline.imputer.transform(X_test), columns=pipeline.features)
+    pipeline.scaler = StandardScaler().fit(X_train[SELECTED_NUMERIC_FEATURES])
+    X_train[SELECTED_NUMERIC_FEATURES] = pipeline.scaler.transform(X_train[SELECTED_NUMERIC_FEATURES])
+    X_test[SELECTED_NUMERIC_FEATURES] = pipeline.scaler.transform(X_test[SELECTED_NUMERIC_FEATURES])
+
+    if sampling == 'smote':
+        X_fit, y_fit = SMOTE(random_state=42).fit_resample(X_train, y_train)
+    else:
+        X_fit, y_fit = X_train, y_train
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if search:
+            model = build_search(model_type).fit(X_fit, y_fit).best_estimator_
+        else:
+            # Reuse the hyperparameters of the current serialized model
+            model = clone(get_registry().get(model_name))
+        cv_scores = cross_val_score(model, X_fit, y_fit, cv=5)
+        model.fit(X_fit.values, y_fit)
+        y_test_pred = model.predict(X_test.values)
+
+    pipeline.model = model
+    metrics = {
+        'accuracy': accuracy_score(y_test, y_test_pred),
+        'precision': precision_score(y_test, y_test_pred, zero_division=0),
+        'recall': recall_score(y_test, y_test_pred, zero_division=0),
+        'f1': f1_score(y_test, y_test_pred, zero_division=0),
+        'cv_accuracy_mean': cv_scores.mean(),
+        'cv_accuracy_std': cv_scores.std(),
+        'confusion_matrix': confusion_matrix(y_test, y_test_pred).tolist(),
+        'training_rows': len(X_fit),
+        'test_rows': len(X_test),
+    }
+    metrics = {key: float(value) if hasattr(value, 'item') else value for key, value in metrics.items()}
+    return pipeline, metrics
+
+
+def save_bundle(pipeline, metrics, model_name, bundle_dir=BUNDLE_DIR, activate=True):
+    """Write a versioned bundle and optionally make it the one served"""
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{model_name}"
+    pipeline.version = version
+    info = {
+        'version': version,
+        'model_name': model_name,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'feature_order': pipeline.features,
+        'vocabularies': pipeline.encoder.vocabularies,
+        'metrics': metrics,
+    }
+    os.makedirs(bundle_dir, exist_ok=True)
+    bundle_path = os.path.join(bundle_dir, f"{version}.joblib")
+    # Write to temporary files first so readers never see a partial bundle
+    joblib.dump({**info, 'pipeline': pipeline}, f"{bundle_path}.tmp")
+    os.replace(f"{bundle_path}.tmp", bundle_path)
+    with open(os.path.join(bundle_dir, f"{version}.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    if activate:
+        activate_bundle(version, bundle_dir)
+    print(f"Saved model bundle {version} to {bundle_path}")
+    return info
+
+
+def activate_bundle(version, bundle_dir=BUNDLE_DIR):
+    """Point the serving path at a saved bundle"""
+    if not os.path.exists(os.path.join(bundle_dir, f"{version}.joblib")):
+        raise FileNotFoundError(f"Model bundle not found: {version}")
+    latest_path = os.path.join(bundle_dir, "LATEST")
+    with open(f"{latest_path}.tmp", 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(f"{latest_path}.tmp", latest_path)
+
+
+def list_bundles(bundle_dir=BUNDLE_DIR):
+    """Return bundle metadata, newest first, so model versions can be compared"""
+    if not os.path.isdir(bundle_dir):
+        return []
+    bundles = []
+    for filename in sorted(os.listdir(bundle_dir), reverse=True):
+        if filename.endswith('.json'):
+            with open(os.path.join(bundle_dir, filename), encoding='utf-8') as f:
+                bundles.append(json.load(f))
+    return bundles
+
+
+def run_training(model_name=ACTIVE_MODEL, search=False, activate=True):
+    """Train on the current merged store and write a new bundle"""
+    pipeline, metrics = fit_pipeline(get_storage().read_frame(), model_name=model_name, search=search)
+    print(f"Trained {model_name}: " + ", ".join(
+        f"{key}={value:.2f}" for key, value in metrics.items() if isinstance(value, float)
+    ))
+    info = save_bundle(pipeline, metrics, model_name, activate=activate)
+    get_registry().refresh_bundle()
+    return info
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train a model bundle from the merged dataset")
+    parser.add_argument("--model", default=ACTIVE_MODEL, help="e.g. NeuralNetwork_smote or RandomForest_original")
+    parser.add_argument("--search", action="store_true", help="run the hyperparameter search instead of reusing the .sav hyperparameters")
+    parser.add_argument("--no-activate", action="store_true", help="save the bundle without serving it")
+    parser.add_argument("--list", action="store_true", help="list saved bundles and their metrics")
+    args = parser.parse_args()
+
+    if args.list:
+        for bundle in list_bundles():
+            print(json.dumps(bundle))
+    else:
+        run_training(model_name=args.model, search=args.search, activate=not args.no_activate)
@@ -0,0 +1,208 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import pandas as pd
+
+USERS_PATH = "../data/login/login_data.xlsx"
+USER_COLUMNS = ["email", "password", "isAdmin", "university"]
+PASSWORD_HASH_SCHEME = os.environ.get("PASSWORD_HASH_SCHEME", "scrypt")
+# Work factors: scrypt cost n (memory is 128 * n * r bytes) and PBKDF2 iterations.
+# Run `python users.py benchmark` to see what they cost per login on this machine.
+SCRYPT_N = int(os.environ.get("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("PBKDF2_ITERATIONS", "600000"))
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p, dklen=32):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=dklen)
+
+
+def _pbkdf2(password, salt, iterations, dklen=32):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=dklen)
+
+
+def hash_password(password, scheme=PASSWORD_HASH_SCHEME, cost=None):
+    """Salted hash in the form scheme$params$salt$digest"""
+    salt = secrets.token_bytes(16)
+    if scheme == 'scrypt':
+        n = cost or SCRYPT_N
+        return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, SCRYPT_R, SCRYPT_P))}"
+    if scheme == 'pbkdf2_sha256':
+        iterations = cost or PBKDF2_ITERATIONS
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(_pbkdf2(password, salt, iterations))}"
+    raise ValueError(f"Unsupported password hash scheme: {scheme}")
+
+
+def is_hashed(stored):
+    parts = stored.split('$')
+    return (parts[0] == 'scrypt' and len(parts) == 6) or (parts[0] == 'pbkdf2_sha256' and len(parts) == 4)
+
+
+def verify_password(password, stored):
+    if not stored:
+        return False
+    parts = stored.split('$')
+    if parts[0] == 'scrypt' and len(parts) == 6:
+        n, r, p = (int(value) for value in parts[1:4])
+        expected = base64.b64decode(parts[5])
+        return hmac.compare_digest(_scrypt(password, base64.b64decode(parts[4]), n, r, p, len(expected)), expected)
+    if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+        expected = base64.b64decode(parts[3])
+        return hmac.compare_digest(_pbkdf2(password, base64.b64decode(parts[2]), int(parts[1]), len(expected)), expected)
+    # Plain-text password written before hashing was introduced
+    return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+
+
+def needs_rehash(stored):
+    """Whether a stored password is plain text or hashed with other settings than the current ones"""
+    parts = stored.split('$')
+    if PASSWORD_HASH_SCHEME == 'scrypt':
+        return parts[:4] != ['scrypt', str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)] or len(parts) != 6
+    return parts[:2] != ['pbkdf2_sha256', str(PBKDF2_ITERATIONS)] or len(parts) != 4
+
+
+def _text(value):
+    return '' if pd.isna(value) else str(value).strip()
+
+
+class UserStore:
+    """Users keyed by email, held in memory and written through to the login spreadsheet.
+
+    The spreadsheet is read again only when its mtime changes, so a login is
+    a dictionary lookup plus one password hash. Plain-text passwords left
+    from before hashing are upgraded the first time their owner logs in.
+    """
+
+    def __init__(self, path=USERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._users = {}
+        self._mtime = None
+        self._dummy_hash = None
+
+    def _load_if_changed(self):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return
+        users = {}
+        if mtime is not None:
+            for record in pd.read_excel(self.path, header=0).to_dict('records'):
+                email = _text(record.get('email'))
+                if email:
+                    is_admin = record.get('isAdmin')
+                    users[email] = {
+                        'email': email,
+                        'password': _text(record.get('password')),
+                        'isAdmin': False if pd.isna(is_admin) else bool(is_admin),
+                        'university': _text(record.get('university')),
+                    }
+        self._users = users
+        self._mtime = mtime
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{os.path.splitext(self.path)[0]}.tmp.xlsx"
+        pd.DataFrame(list(self._users.values()), columns=USER_COLUMNS).to_excel(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def authenticate(self, email, password):
+        """Return the user's isAdmin and university if the password matches, otherwise None"""
+        email = str(email).strip()
+        password = str(password).strip()
+        with self._lock:
+            self._load_if_changed()
+            user = self._users.get(email)
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(secrets.token_hex(8))
+        # Unknown emails still pay for a hash, so timing does not reveal which accounts exist
+        stored = user['password'] if user else self._dummy_hash
+        if not verify_password(password, stored) or user is None:
+            return None
+
+        if needs_rehash(stored):
+            hashed = hash_password(password)
+            with self._lock:
+                if self._users.get(email) is user:
+                    user['password'] = hashed
+                    self._save()
+        return {'isAdmin': user['isAdmin'], 'university': user['university']}
+
+    def add(self, email, password, is_admin=False, university=''):
+        email = str(email).strip()
+        hashed = hash_password(str(password).strip())
+        with self._lock:
+            self._load_if_changed()
+            if email in self._users:
+                raise ValueError("User already exists")
+            self._users[email] = {'email': email, 'password': hashed, 'isAdmin': bool(is_admin), 'university': university}
+            self._save()
+
+    def delete(self, email):
+        with self._lock:
+            self._load_if_changed()
+            if self._users.pop(str(email).strip(), None) is None:
+                raise KeyError("User not found")
+            self._save()
+
+    def migrate(self):
+        """Hash every stored plain-text password; return how many were converted"""
+        with self._lock:
+            self._load_if_changed()
+            plain = [user for user in self._users.values() if user['password'] and not is_hashed(user['password'])]
+            for user in plain:
+                user['password'] = hash_password(user['password'])
+            if plain:
+                self._save()
+        return len(plain)
+
+
+_user_store = None
+_user_store_lock = threading.Lock()
+
+def get_user_store():
+    """Return the process-wide user store"""
+    global _user_store
+    with _user_store_lock:
+        if _user_store is None:
+            _user_store = UserStore()
+        return _user_store
+
+
+def benchmark(rounds=5):
+    """Time one hash for a range of work factors, to pick the login latency budget"""
+    import time
+
+    settings = [('scrypt', 2 ** exponent) for exponent in range(12, 18)]
+    settings += [('pbkdf2_sha256', iterations) for iterations in (100000, 300000, 600000, 1000000)]
+    for scheme, cost in settings:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            hash_password('benchmark-password', scheme=scheme, cost=cost)
+        elapsed_ms = (time.perf_counter() - started) / rounds * 1000
+        current = (scheme, cost) in (('scrypt', SCRYPT_N), ('pbkdf2_sha256', PBKDF2_ITERATIONS)) and scheme == PASSWORD_HASH_SCHEME
+        print(f"{scheme:<14} cost={cost:<8} {elapsed_ms:8.1f} ms/hash{'  <- current' if current else ''}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage dashboard users")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    benchmark_parser = subparsers.add_parser("benchmark", help="time password hashing for a range of work factors")
+    benchmark_parser.add_argument("--rounds", type=int, default=5)
+    subparsers.add_parser("migrate", help="hash every plain-text password in the login spreadsheet")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        benchmark(args.rounds)
+    elif args.command == "migrate":
+        print(f"Hashed {get_user_store().migrate()} plain-text passwords in {USERS_PATH}")
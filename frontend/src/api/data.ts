@@ -53,45 +53,54 @@ export async function getDashboardData(university: string = 'All'): Promise<Dash
   return response.json();
 }
 
-export const generateReport = async (filteredData: DashboardData[], chartImages: { [key: string]: string }) => {
-  try {
-    if (!filteredData?.length) throw new Error('Invalid filtered data');
-    if (!chartImages || !Object.keys(chartImages).length) throw new Error('No chart images provided');
+export interface JobStatus {
+  job_id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'finished' | 'failed';
+  progress: number;
+  stage: string | null;
+  error: string | null;
+}
+
+export const getJobStatus = async (jobId: string): Promise<JobStatus> => {
+  const response = await fetch(`http://localhost:8000/api/jobs/${jobId}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch job status');
+  }
+  return response.json();
+};
 
-    // Clean and transform the data
-    const cleanedData = filteredData.map(item => ({
-      ...item,
-      // Convert numeric fields and handle NaN/null
-      age: Number(item.age) || 0,
-      hours_per_week_university_work: Number(item.hours_per_week_university_work) || 0,
-      work_hours_per_week: Number(item.work_hours_per_week) || 0,
-      hours_socialising: Number(item.hours_socialising) || 0,
-      hours_socialmedia: Number(item.hours_socialmedia) || 0,
-      total_device_hours: Number(item.total_device_hours) || 0,
-      cost_of_study: Number(item.cost_of_study) || 0,
-      hours_per_week_lectures: Number(item.hours_per_week_lectures) || 0,
-      hours_between_lectures: Number(item.hours_between_lectures) || 0,
-      exercise_per_week: Number(item.exercise_per_week) || 0,
-      predictions: isNaN(Number(item.predictions)) ? 0 : Number(item.predictions), // Ensure predictions field is a valid number
-      captured_at: item.captured_at || new Date().toISOString(), // Ensure captured_at field is included
-    }));
+export const waitForJob = async (
+  jobId: string,
+  onProgress?: (job: JobStatus) => void,
+  intervalMs: number = 1000
+): Promise<JobStatus> => {
+  while (true) {
+    const job = await getJobStatus(jobId);
+    onProgress?.(job);
+    if (job.status === 'finished') return job;
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
 
-    // Process and validate chart images
-    const processedChartImages = Object.fromEntries(
-      Object.entries(chartImages)
-        .filter(([_, value]) => value?.startsWith('data:image/'))
-        .map(([key, value]) => [key, value])
-    );
+export interface ReportQuery {
+  university?: string;
+  year?: string;
+  filters?: { [key: string]: (string | number)[] };
+  departments?: string[];
+}
 
-    const payload = {
-      data: cleanedData,
-      charts: processedChartImages
+export const generateReport = async (query: ReportQuery, onProgress?: (job: JobStatus) => void) => {
+  try {
+    // Only the selection is sent; the backend renders the charts from its own copy of the data
+    const payload: ReportQuery = {
+      ...query,
+      filters: Object.fromEntries(
+        Object.entries(query.filters || {}).filter(([_, values]) => values?.length)
+      ),
     };
 
-    // Debug: Print the number of charts being sent
-    console.log(`Number of charts being sent: ${Object.keys(processedChartImages).length}`);
-    console.log('Sending payload:', JSON.stringify(payload, null, 2));
-
     const response = await fetch('http://localhost:8000/api/reports', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -104,6 +113,8 @@ export const generateReport = async (filteredData: DashboardData[], chartImages:
       throw new Error(`Server error: ${responseData.detail || JSON.stringify(responseData)}`);
     }
     
+    // The report is built in the background; wait until it is ready to view
+    await waitForJob(responseData.job_id, onProgress);
     return responseData;
   } catch (error) {
     console.error('Error generating report:', error);
@@ -4,7 +4,6 @@ import { Box, Grid, Typography, CircularProgress, Alert, Button } from '@mui/mat
 import { FilterPanel } from './FilterPanel';
 import type { FilterState, DashboardData } from '../../types/dashboard';
 import { getDashboardData, generateReport } from '../../api/data';
-import html2canvas from 'html2canvas';
 import { Demographics } from './Demographics';
 import { PsychologicalAndEmotionalFactors } from './PsychologicalAndEmotionalFactors';
 import { AcademicContext } from './AcademicContext';
@@ -75,35 +74,14 @@ const MentalHealthDashboard: React.FC = () => {
   const socialAndTechnologicalFactorsRefs = [useRef(null), useRef(null), useRef(null)];
   const psychologicalAndEmotionalFactorsRefs = [useRef(null), useRef(null), useRef(null), useRef(null), useRef(null), useRef(null)];
 
-  const captureChartImages = async () => {
-    const allChartRefs = [
-      ...demographicsRefs,
-      ...academicContextRefs,
-      ...socioeconomicFactorsRefs,
-      ...lifestyleAndBehaviourRefs,
-      ...socialAndTechnologicalFactorsRefs,
-      ...psychologicalAndEmotionalFactorsRefs,
-    ];
-  
-    const chartImages: { [key: string]: string } = {};
-    let canvas: HTMLCanvasElement;
-    for (const ref of allChartRefs) {
-      if (ref.current) {
-        canvas = await html2canvas(ref.current, { allowTaint: true, useCORS: true, logging: true });
-        chartImages[ref.current.id || `chart-${Object.keys(chartImages).length + 1}`] = canvas.toDataURL('image/png');
-      }
-    }
-  
-    return chartImages;
-  };
-
   const handleGenerateReport = async () => {
     setGeneratingReport(true); // Set loading state to true
     try {
-      // const chartImages = await captureChartImages();
-      // console.log(`Number of charts being sent: ${Object.keys(chartImages).length}`);
-      const chartImages = await captureChartImages();
-      const response = await generateReport(filteredData, chartImages);
+      const response = await generateReport({
+        university: selectedUniversity,
+        year: selectedYear,
+        filters,
+      });
       alert('Report generated successfully');
       setReportUrl(response?.report_url);
     } catch (error) {